@@ -14,20 +14,28 @@
    References:
    - https://stackoverflow.com/questions/613183/how-do-i-sort-a-dictionary-by-value
    """
+from collections import Counter
+import heapq
 import operator
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from datetime import datetime
 import matplotlib.pyplot as plt
-from data_manager import Dataset
+from data_manager import Dataset, StreamingDataset, convert_to_datetime
+from heavy_hitters import SpaceSaving
+from sentiment_rollup import sentiment_rollup
+from tweet_index import hashtag_index, parse_hashtags, tokenize
+from dataset_cache import load_dataset
 
 
 def load_data(filename: str) -> Dataset:
-    """Use data handler library to extract data from our dataset
+    """Use data handler library to extract data from our dataset. The typed
+    dataset is cached on disk, so it is only parsed again when the file changes.
+    The hashtags of every tweet are loaded as a list of lower-case hashtags.
     @param filename: path for the dataset
     @return: dataset as a list of list
     """
-    return Dataset(filepath=filename,
-                   types=[str, float, str, list, int, int, datetime, str, int, str])
+    return load_dataset(filename,
+                        types=[str, float, str, parse_hashtags, int, int, datetime, str, int, str])
 
 
 def grp_by_days(date: datetime) -> float:
@@ -38,15 +46,36 @@ def grp_by_days(date: datetime) -> float:
     return date.day
 
 
-def plot_sentiments(filepath: str) -> None:
+def plot_sentiments(filepath: str, granularity: Optional[str] = None) -> None:
     """Use matplotlib.pyplot to plot a scatterplot with lines joining the points
     @param filepath: path for the dataset
+    @param granularity: 'hour' or 'day' to plot the average for every hour or calendar
+                        day from the saved statistics of the dataset (see sentiment_rollup),
+                        or None to plot the average for every day of the month
     @return: The function just plots a graph
     """
+    if granularity is not None:
+        series = sentiment_rollup(filepath).series(granularity)
+
+        plt.plot([bucket for bucket, _ in series], [stats['mean'] for _, stats in series], marker='o')
+        plt.show()
+        return
+
     data = load_data(filepath)
 
     x, y = data.calculate_average(6, 1, grp_by_days)
 
+    draw_sentiments(x, y)
+
+
+def draw_sentiments(x: list, y: list) -> None:
+    """Plot the average sentiment <y> of the tweets of every day <x>, as returned by
+    calculate_average, with lines joining the points
+    @param x: the dates, one for every day of the month
+    @param y: the average sentiment score for every day
+    """
+    x, y = list(x), list(y)
+
     date, value = x.pop(), y.pop()
 
     list.insert(x, 0, date)
@@ -56,62 +85,215 @@ def plot_sentiments(filepath: str) -> None:
     plt.show()
 
 
+# hashtags of the tweets of the dataset, the words which are part of them are not counted
+TAGS = ['#climatechange',
+        '#climatechangeisreal',
+        '#actonclimate'
+        '#globalwarming',
+        '#climatechangehoax',
+        '#climatedeniers',
+        '#climatechangeisfalse',
+        '#globalwarminghoax',
+        '#climatechangenotreal']
+
+# only words longer than this are counted
+MIN_WORD_LENGTH = 6
+
+# all the words of more than MIN_WORD_LENGTH characters which are part of some tag,
+# so checking if a word is part of a tag is a single set lookup
+TAG_WORDS = {tag[start:end] for tag in TAGS
+             for start in range(len(tag))
+             for end in range(start + MIN_WORD_LENGTH + 1, len(tag) + 1)}
+
+
 def word_count(string: str) -> Dict[str, int]:
     """Count the number of times all the words are occurring in the string
     and return a dict with each word mapped to its count
     @param string: The string for which we want word count
     @return: dict mapping word to its count
     """
-    tags = ['#climatechange',
-            '#climatechangeisreal',
-            '#actonclimate'
-            '#globalwarming',
-            '#climatechangehoax',
-            '#climatedeniers',
-            '#climatechangeisfalse',
-            '#globalwarminghoax',
-            '#climatechangenotreal']
-
-    words = {}
-    text = string. \
-        replace('.', ''). \
-        replace('"', ''). \
-        replace(',', ''). \
-        replace('-', ''). \
-        replace('_', ''). \
-        replace('#', ''). \
-        replace('?', ''). \
-        replace('@', '').lower()
-
-    for element in text.split():
-        if len(element) > 6 and all(element not in hashtag for hashtag in tags):
-            if element in words:
-                words[element] += 1
-            else:
-                words[element] = 1
-
-    return words
-
-
-def plot_top_10(filepath: str) -> None:
+    return dict(count_words([string]))
+
+
+def normalize_words(text: str) -> List[str]:
+    """Return the words of <text> as they are counted by word_count: lower-case,
+    without punctuation, and only the words of more than MIN_WORD_LENGTH characters
+    which are not part of a tag
+    @param text: the text of a tweet
+    @return: list of the words, in order
+    """
+    return [word for word in tokenize(text) if len(word) > MIN_WORD_LENGTH and word not in TAG_WORDS]
+
+
+def count_words(texts: Iterable[str], capacity: Optional[int] = None) -> Union[Counter, SpaceSaving]:
+    """Count the number of times all the words are occurring in <texts>, counting
+    every text on its own, so the texts can be read one at a time from a file.
+    If <capacity> is given, only the approximate counts of the <capacity> most
+    frequent words are kept (see heavy_hitters), so the memory used does not grow
+    with the number of distinct words.
+    @param texts: the texts (like tweets) for which we want word count
+    @param capacity: the number of words counted at once, or None to count all of them exactly
+    @return: Counter (or SpaceSaving if capacity is given) mapping word to its count
+    """
+    counts = Counter() if capacity is None else SpaceSaving(capacity)
+
+    for text in texts:
+        counts.update(normalize_words(text))
+
+    return counts
+
+
+def top_words(counts: Dict[str, int], k: int) -> List[Tuple[str, int]]:
+    """Return the <k> words with the highest counts in <counts>, from the highest count,
+    without sorting all the words
+    @param counts: dict mapping word to its count
+    @param k: the number of words
+    @return: list of (word, count) tuples
+    """
+    return heapq.nlargest(k, counts.items(), key=operator.itemgetter(1))
+
+
+def count_hashtags(filepath: str, capacity: Optional[int] = None) -> Union[Counter, SpaceSaving]:
+    """Count the number of tweets in which every hashtag (in lower-case) is used.
+    The exact counts are read from the hashtag index of the dataset (see tweet_index).
+    @param filepath: path to the dataset
+    @param capacity: the number of hashtags counted at once, or None to count all of them
+                     exactly (see count_words)
+    @return: Counter (or SpaceSaving if capacity is given) mapping hashtag to its count
+    """
+    if capacity is None:
+        return hashtag_index(filepath).counts()
+
+    data = StreamingDataset(filepath, usecols=[3])
+
+    counts = SpaceSaving(capacity)
+
+    for tweet in data.iter_rows():
+        counts.update(set(parse_hashtags(tweet[0])))
+
+    return counts
+
+
+def plot_top_10(filepath: str, capacity: Optional[int] = None) -> None:
     """Plot a count-plot for the highest occurring words in the tweets
     @param filepath: path to the dataset
+    @param capacity: the number of words counted at once, or None to count all of them
+                     exactly (see count_words)
     """
-    data = Dataset(filepath)
-    text = ''
+    data = StreamingDataset(filepath, usecols=[0])
 
-    for tweet in data.get():
-        text += tweet[0]
+    words = count_words((tweet[0] for tweet in data.iter_rows()), capacity)
 
-    words = word_count(text)
+    draw_top_words(top_words(words, 11))
 
-    sorted_words = sorted(words.items(), key=operator.itemgetter(1), reverse=True)[:11]
 
+def draw_top_words(sorted_words: List[Tuple[str, int]]) -> None:
+    """Plot a count-plot of the words in <sorted_words>
+    @param sorted_words: list of (word, count) tuples, from the highest count
+    """
     plt.bar([word[0] for word in sorted_words],
             [word[1] for word in sorted_words])
     plt.show()
 
 
+class TweetAnalytics:
+    """
+    The results of all the analyses of the tweets of a dataset which are used by
+    the charts, computed together in a single pass over the dataset (see
+    analyze_tweets), so the dataset is only read and parsed once for all the charts.
+
+    Instance Attributes:
+    - daily_average: the dates and the average sentiment score for every day of the
+                     month, like calculate_average(6, 1, grp_by_days) returns them
+    - words: the number of times every word is used (see count_words)
+    - hashtags: the number of tweets using every hashtag (see count_hashtags)
+    - users: dict mapping every username to the average sentiment score of their
+             tweets weighted by their followers count, and their followers count
+
+    Representation Invariants:
+    - len(self.daily_average[0]) == len(self.daily_average[1])
+    """
+    daily_average: List[list]
+    words: Union[Counter, SpaceSaving]
+    hashtags: Union[Counter, SpaceSaving]
+    users: Dict[str, Tuple[float, int]]
+
+    def __init__(self,
+                 daily_average: List[list],
+                 words: Union[Counter, SpaceSaving],
+                 hashtags: Union[Counter, SpaceSaving],
+                 users: Dict[str, Tuple[float, int]]) -> None:
+        """Initialize the results of the analyses"""
+        self.daily_average = daily_average
+        self.words = words
+        self.hashtags = hashtags
+        self.users = users
+
+    def top_words(self, k: int = 11) -> List[Tuple[str, int]]:
+        """Return the <k> words used the most and their counts"""
+        return top_words(self.words, k)
+
+    def top_hashtags(self, k: int = 10) -> List[Tuple[str, int]]:
+        """Return the <k> hashtags used by the most tweets and their counts"""
+        return top_words(self.hashtags, k)
+
+    def top_users(self, k: int = 10) -> List[Tuple[str, Tuple[float, int]]]:
+        """Return the <k> users with the most followers, with their weighted average
+        sentiment score and followers count"""
+        return heapq.nlargest(k, self.users.items(), key=lambda user: user[1][1])
+
+
+def analyze_tweets(filepath: str, capacity: Optional[int] = None) -> TweetAnalytics:
+    """Compute all the analyses of the tweets of the dataset made by add_sentiments_to_data
+    at <filepath> which are used by the charts, in a single pass over the dataset.
+
+    For every user, the sentiment scores of their tweets are weighted by the followers
+    count of the tweet, so tweets seen by more people count more.
+
+    @param filepath: path to the dataset
+    @param capacity: the number of words and hashtags counted at once, or None to count
+                     all of them exactly (see count_words)
+    @return: the results of the analyses
+    """
+    words = Counter() if capacity is None else SpaceSaving(capacity)
+    hashtags = Counter() if capacity is None else SpaceSaving(capacity)
+
+    # ACCUMULATOR: for every day of the month, the first date, and the sum and number of scores
+    days = {}
+    # ACCUMULATOR: for every user, the sum of weighted scores, the sum of weights, the sum
+    # and number of scores, and the followers count
+    users = {}
+
+    for tweet in StreamingDataset(filepath).iter_rows():
+        score = float(tweet[1])
+        followers = int(tweet[8])
+
+        words.update(normalize_words(tweet[0]))
+        hashtags.update(set(parse_hashtags(tweet[3])))
+
+        date = convert_to_datetime(tweet[6])
+        day = days.setdefault(grp_by_days(date), [date, 0.0, 0])
+        day[1] += score
+        day[2] += 1
+
+        user = users.setdefault(tweet[7], [0.0, 0, 0.0, 0, 0])
+        user[0] += score * followers
+        user[1] += followers
+        user[2] += score
+        user[3] += 1
+        user[4] = followers
+
+    # like calculate_average, the days are in the order of a set of the days
+    daily_average = [[days[day][0] for day in set(days)],
+                     [days[day][1] / days[day][2] for day in set(days)]]
+
+    # the tweets of users with no followers at all all get the same weight
+    weighted = {username: (total / weights if weights else plain_total / count, followers)
+                for username, (total, weights, plain_total, count, followers) in users.items()}
+
+    return TweetAnalytics(daily_average, words, hashtags, weighted)
+
+
 if __name__ == '__main__':
     import python_ta
 
@@ -119,7 +301,13 @@ if __name__ == '__main__':
         'extra-imports': ['datetime',
                           'matplotlib.pyplot',
                           'data_manager',
+                          'dataset_cache',
                           'typing',
+                          'collections',
+                          'heavy_hitters',
+                          'sentiment_rollup',
+                          'tweet_index',
+                          'heapq',
                           'operator'],
         'allowed-io': [],
         'max-line-length': 150,
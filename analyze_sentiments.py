@@ -6,63 +6,243 @@ on dataset of collection of words we have
 """
 
 # import libraries
-from datetime import datetime
-from typing import Dict, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice, repeat
+from typing import Any, Dict, Tuple, Iterable, Iterator, List, Optional, Set, Union
 import csv
-import ast
-
-
-def add_sentiments_to_data(filename: str, words_list: str) -> None:
+import hashlib
+import json
+import marshal
+import multiprocessing
+import os
+
+import numpy as np
+
+from data_manager import OffsetLines
+from sentiment_rollup import sentiment_rollup
+
+
+def add_sentiments_to_data(filename: str,
+                           words_list: str,
+                           output_path: str = 'datasets/twitter/climate-change-sentiment.csv',
+                           workers: int = 1,
+                           batch_size: int = 5000,
+                           resume: bool = True,
+                           vectorized: bool = False,
+                           incremental: bool = False,
+                           rollup: bool = False) -> None:
     """ The function reads the dataset with all the tweets and sentiment score
     to the dataset to produce a new dataset.
 
+    The tweets are read, scored and written in batches of <batch_size> tweets, so
+    only one batch is kept in memory at a time. After every batch is written, a
+    checkpoint file (see checkpoint_path) records how far the input and output files
+    got (when rows are added to a dataset which is already there, a first checkpoint
+    records its size before any row is written). If the function stops before the end,
+    calling it again with the same files continues from the last checkpoint instead of
+    starting over.
+
+    In incremental mode, the tweets already in the dataset at <output_path> are not
+    scored again: only the tweets of <filename> whose key (see tweet_key) is not in
+    that dataset are scored and appended to it, so updating the dataset after new
+    tweets are collected takes time proportional to the number of new tweets.
+
     @param filename: the path of the dataset with all the tweets
     @param words_list: the path for the dataset with words for calculating sentiment score
+    @param output_path: the path of the new dataset
+    @param workers: number of processes used to score the tweets
+    @param batch_size: number of tweets scored and written at once
+    @param resume: if we want to continue from the last checkpoint when there is one
+    @param vectorized: if the tweets are scored with numpy (see Lexicon.score_array)
+    @param incremental: if only the tweets which are not in the dataset at <output_path>
+                        yet are scored and appended to it
+    @param rollup: if the saved hourly and daily statistics of the new dataset are updated
+                   with the rows written (see sentiment_rollup)
     @return: None
 
     Preconditions:
     - filename is a valid path
+    - workers >= 1
+    - batch_size > 0
+    """
+
+    # getting the words for calculating sentiment score, prepared once for all the tweets
+    lexicon = Lexicon(extract_words(words_list))
+
+    checkpoint = read_checkpoint(output_path, filename) if resume else None
+
+    if checkpoint:
+        # drop anything written after the last checkpoint
+        os.truncate(output_path, checkpoint['output_offset'])
+
+    # if the rows are added to the end of a dataset which is already there
+    appending = bool(checkpoint) or incremental and os.path.exists(output_path) and os.path.getsize(output_path) > 0
+
+    # the keys of the tweets already scored, when only new tweets are added
+    if incremental:
+        scored = read_tweet_keys(output_path) if appending else set()
+    else:
+        scored = None
+
+    executor = scoring_pool(lexicon, workers) if workers > 1 else None
+
+    try:
+        with open(filename, 'rb') as input_file:
+            if checkpoint:
+                # continue from the last checkpoint
+                input_file.seek(checkpoint['input_offset'])
+
+            output_file = open(output_path, 'a' if appending else 'w', newline='', buffering=OUTPUT_BUFFER_SIZE)
+
+            with output_file:
+                lines = OffsetLines(input_file)
+                reader = csv.reader(lines)
+                writer = csv.writer(output_file)
+
+                if not checkpoint:
+                    next(reader)
+
+                if not appending:
+                    writer.writerow(OUTPUT_HEADER)
+                elif not checkpoint:
+                    # a batch is larger than the buffer of the output file, so a row may be
+                    # half written if the function stops during the first batch; the rows
+                    # after the dataset already there are then dropped when it is resumed
+                    write_checkpoint(output_path, filename, lines.offset, output_file.tell())
+
+                if scored is not None:
+                    reader = new_tweets(reader, scored)
+
+                batch = list(islice(reader, batch_size))
+
+                while batch:
+                    texts = [row[0] for row in batch]
+                    if executor:
+                        scores = score_in_pool(executor, texts, vectorized=vectorized)
+                    else:
+                        scores = lexicon.score_many(texts, vectorized=vectorized)
+
+                    # the other columns are written as they were read, since they are
+                    # already in the same format as the converted values would be written
+                    writer.writerows([[row[0], score, tag] + row[1:8] for row, (score, tag) in zip(batch, scores)])
+
+                    output_file.flush()
+                    os.fsync(output_file.fileno())
+                    write_checkpoint(output_path, filename, lines.offset, output_file.tell())
+
+                    batch = list(islice(reader, batch_size))
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if os.path.exists(checkpoint_path(output_path)):
+        os.remove(checkpoint_path(output_path))
+
+    if rollup:
+        sentiment_rollup(output_path)
+
+
+# the columns of the dataset made by add_sentiments_to_data
+OUTPUT_HEADER = ['tweet_text',  # text of the tweet
+                 'senti-score',  # sentiment score of the tweet
+                 'senti-type',  # neutral, positive or negative
+                 'all_hashtags',  # list of all the hashtags in the tweet
+                 'favorite_count',  # number of likes to the tweet
+                 'retweet_count',  # number of times the tweet was retweeted
+                 'created_at',  # date and time of creation
+                 'username',  # username of the person who tweeted the tweet
+                 'followers_count',  # number of followers the user has
+                 'location']  # the location of the user
+
+# size of the buffer of the output file, so rows are written in large blocks
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+
+def tweet_key(text: str, username: str, created_at: str) -> bytes:
+    """Return a key identifying the tweet with <text> tweeted by <username> at <created_at>.
+    The key is a hash of these values, so it is the same in every run and small enough
+    to keep the keys of millions of tweets in memory.
+
+    @param text: the text of the tweet
+    @param username: the username of the person who tweeted the tweet
+    @param created_at: date and time of creation, as written in the datasets
+    @return: the key of the tweet
+    """
+    return hashlib.blake2b('\x1f'.join((text, username, created_at)).encode(), digest_size=16).digest()
+
+
+def new_tweets(reader: Iterable[List[str]], scored: Set[bytes]) -> Iterator[List[str]]:
+    """Yield the rows of the dataset with all the tweets read by <reader> whose key
+    is not in <scored>, adding the key of every row yielded to <scored>, so every
+    tweet is only yielded once
+
+    @param reader: the rows of the dataset with all the tweets, after the header row
+    @param scored: the keys of the tweets already scored
+    @return: generator of the rows of the new tweets
+    """
+    for row in reader:
+        key = tweet_key(row[0], row[5], row[4])
+
+        if key not in scored:
+            scored.add(key)
+            yield row
+
+
+def read_tweet_keys(output_path: str) -> Set[bytes]:
+    """Return the keys (see tweet_key) of all the tweets in the dataset made by
+    add_sentiments_to_data at <output_path>
+
+    @param output_path: the path of the dataset with the scored tweets
+    @return: set of the keys of the tweets
+    """
+    with open(output_path, newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+
+        return {tweet_key(row[0], row[7], row[6]) for row in reader}
+
+
+def checkpoint_path(output_path: str) -> str:
+    """Return the path of the checkpoint file for the dataset at <output_path>"""
+    return output_path + '.checkpoint'
+
+
+def read_checkpoint(output_path: str, filename: str) -> Optional[Dict[str, Any]]:
+    """Return the last checkpoint written while making the dataset <output_path>
+    from the tweets in <filename>, or None if there is no such checkpoint.
+
+    @param output_path: the path of the dataset being made
+    @param filename: the path of the dataset with all the tweets
+    @return: dict with the input_offset and output_offset of the checkpoint, or None
     """
+    try:
+        with open(checkpoint_path(output_path)) as file:
+            checkpoint = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if checkpoint.get('input') != os.path.abspath(filename) or not os.path.exists(output_path):
+        return None
+
+    return checkpoint
+
+
+def write_checkpoint(output_path: str, filename: str, input_offset: int, output_offset: int) -> None:
+    """Record that the dataset <output_path> has been written up to <output_offset>,
+    with all the tweets in <filename> before <input_offset>. The checkpoint is written
+    under another name first and then renamed, so it is never read half written."""
+    path = checkpoint_path(output_path)
+
+    with open(path + '.tmp', 'w') as file:
+        json.dump({'input': os.path.abspath(filename),
+                   'input_offset': input_offset,
+                   'output_offset': output_offset}, file)
+
+    os.replace(path + '.tmp', path)
+
 
-    # getting the words dictionary for calculating sentiment score
-    words = extract_words(words_list)
-
-    # extracting the tweet text out of the data
-    with open(filename, 'r') as input_file:
-        with open('datasets/twitter/climate-change-sentiment.csv', 'w') as output_file:
-            reader = csv.reader(input_file)
-            writer = csv.writer(output_file)
-
-            next(reader)
-
-            reader = list(reader)
-
-            writer.writerow(['tweet_text',  # text of the tweet
-                             'senti-score',  # sentiment score of the tweet
-                             'senti-type',  # neutral, positive or negative
-                             'all_hashtags',  # list of all the hashtags in the tweet
-                             'favorite_count',  # number of likes to the tweet
-                             'retweet_count',  # number of times the tweet was retweeted
-                             'created_at',  # date and time of creation
-                             'username',  # username of the person who tweeted the tweet
-                             'followers_count',  # number of followers the user has
-                             'location'])  # the location of the user
-
-            for row in reader:
-                score, tag = analyze_sentiments(row[0], words)
-                writer.writerow([row[0],
-                                 score,
-                                 tag,
-                                 ast.literal_eval(row[1]),
-                                 int(row[2]),
-                                 int(row[3]),
-                                 datetime.fromisoformat(row[4]),
-                                 row[5],
-                                 int(row[6]),
-                                 row[7]])
-
-
-def extract_words(filename: str) -> Dict[str, float]:
+def extract_words(filename: str, use_cache: bool = True) -> Dict[str, float]:
     """ The function reads the dataset with all the positive and negative words
     and returns a list of dicts with all the words mapped to a score of -1 to 1
     where -1 is very negative and 1 is very positive word. if a word has a score
@@ -76,12 +256,22 @@ def extract_words(filename: str) -> Dict[str, float]:
     do not use - or _, instead we us space, thus we would replace all - and _ to
     space.
 
+    Reading the whole file takes a while, so the extracted words are saved in a
+    compiled file next to it (see words_cache_path), which is read instead of the
+    file as long as the file is not modified.
+
     @param filename: the path of the dataset with all the words and their cores
+    @param use_cache: if the compiled file can be used and written
     @return: a dict mapping word to its score
 
     Preconditions:
     - filename is a valid path
     """
+    if use_cache:
+        words = read_words_cache(filename)
+
+        if words is not None:
+            return words
 
     # extracting the file
     with open(filename) as file:
@@ -101,57 +291,456 @@ def extract_words(filename: str) -> Dict[str, float]:
 
             words_so_far[word] = score  # adding word and its score to return dict
 
-        return words_so_far
+    if use_cache:
+        write_words_cache(filename, words_so_far)
 
+    return words_so_far
 
-def analyze_sentiments(tweet_txt: str, words_list: Dict[str, float]) -> Tuple[float, str]:
-    """ Returns a sentiment score for the tweet by adding up the score of all
-    the words it contains which are in the words list.
 
-    The score only depends on the words with a magnitude higher that 0, thus we
-    would remove words with score 0. This would help in increasing the speed of the
-    loop.
+def words_cache_path(filename: str) -> str:
+    """Return the path of the compiled file for the words dataset <filename>"""
+    return filename + '.marshal'
 
-    @param tweet_txt: The tweet for which we want to analyze sentiments
-    @param words_list: the list of words with their sentiment scores
-    @return: a sentiment score for the tweet
+
+def read_words_cache(filename: str) -> Optional[Dict[str, float]]:
+    """Return the words saved in the compiled file for the words dataset <filename>,
+    or None if there is no compiled file or it was made from an older version of the
+    dataset (with a different modification time or size).
+
+    @param filename: the path of the dataset with all the words and their cores
+    @return: a dict mapping word to its score, or None
+    """
+    stat = os.stat(filename)
+
+    try:
+        with open(words_cache_path(filename), 'rb') as file:
+            mtime, size, words = marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if mtime != stat.st_mtime_ns or size != stat.st_size:
+        return None
+
+    return words
+
+
+def write_words_cache(filename: str, words: Dict[str, float]) -> None:
+    """Save <words> in the compiled file for the words dataset <filename>. The file is
+    written under another name first and then renamed, so it is never read half written.
+    Nothing is saved if the directory can not be written.
+
+    @param filename: the path of the dataset with all the words and their cores
+    @param words: a dict mapping word to its score
     """
+    stat = os.stat(filename)
+    path = words_cache_path(filename)
 
-    # remove neutral words from the list as they don't impact the sentiments
-    refined_list = {}
+    try:
+        with open(path + '.tmp', 'wb') as file:
+            file.write(marshal.dumps((stat.st_mtime_ns, stat.st_size, words)))
 
-    for word in words_list:
-        if words_list[word] != 0:
-            refined_list[word] = words_list[word]
+        os.replace(path + '.tmp', path)
+    except OSError:
+        pass
 
-    # our words in the refined_list are only lowe-case  so we have to covert
-    # the tweet into all lower-case.
-    text = str.lower(tweet_txt)
 
-    score_so_far = 0.0  # ACCUMULATOR: stores the sentiment score
-    tag = 'neutral'
+class Lexicon:
+    """
+    The words used for calculating sentiment scores, prepared once so that
+    any number of tweets can be scored with them.
+
+    The score only depends on the words with a magnitude higher that 0, thus
+    words with score 0 are removed. The words are lower-case with single spaces,
+    like the tweet text they are compared to.
+
+    Many entries of the lexicon are phrases of more than one word, so the tweets
+    are matched with an Aho-Corasick automaton over words: every state is a
+    sequence of words which is the start of some entry, and reading a tweet word
+    by word finds every entry (single words and phrases, overlapping or not) in
+    one pass over the tweet.
+
+    Many tweets can also be scored at once with numpy (see score_array): every
+    word of the lexicon gets an integer id, the first n words of the entries are
+    stored as hashes of their ids in a sorted array for every n, and a batch of
+    tweets becomes one array of word ids with the offset of every tweet in it, in
+    which all the entries are looked up together.
+
+    Instance Attributes:
+    - scores: dict mapping every word or phrase with a non-zero score to its score
+
+    Private Instance Attributes:
+    - _goto: for every state, dict mapping the next word to the next state
+    - _fail: for every state, the state for the longest proper suffix of its words
+             which is also a state
+    - _output: for every state, the sum of the scores of all the entries ending there
+    - _word_ids: dict mapping every word of an entry to its id (starting at 1), or
+                 None if the tables for score_array are not built yet
+    - _single_scores: array of the score of the entry of every word id (0 if none)
+    - _starts_entry: array of whether every word id starts an entry of more than one word
+    - _entry_tables: for every number of words n (from 2), a tuple of the sorted hashes
+                     of the first n words of all the entries of n words or more, and
+                     the score of these words (0 if they are not an entry themselves)
+
+    Representation Invariants:
+    - all(self.scores[word] != 0 for word in self.scores)
+    - len(self._goto) == len(self._fail) == len(self._output)
+    """
+    scores: Dict[str, float]
+    _goto: List[Dict[str, int]]
+    _fail: List[int]
+    _output: List[float]
+    _word_ids: Optional[Dict[str, int]]
+    _single_scores: np.ndarray
+    _starts_entry: np.ndarray
+    _entry_tables: List[Tuple[np.ndarray, np.ndarray]]
+
+    def __init__(self, words_list: Dict[str, float]) -> None:
+        """Initialize the lexicon from <words_list>, a dict mapping words to their
+        score as returned by extract_words"""
+        self.scores = {}
+
+        for word in words_list:
+            key = ' '.join(word.lower().split())
+
+            if words_list[word] != 0:
+                self.scores[key] = words_list[word]
+            else:
+                self.scores.pop(key, None)
+
+        self._build_automaton()
+
+        self._word_ids = None
+        self._entry_tables = []
+
+    def _build_automaton(self) -> None:
+        """Build the word-level Aho-Corasick automaton for the entries in self.scores"""
+        self._goto = [{}]
+        self._output = [0.0]
+
+        # the trie of all the entries, state 0 being the empty sequence of words
+        for entry, score in self.scores.items():
+            state = 0
+
+            for word in entry.split(' '):
+                if word not in self._goto[state]:
+                    self._goto.append({})
+                    self._output.append(0.0)
+                    self._goto[state][word] = len(self._goto) - 1
+
+                state = self._goto[state][word]
+
+            self._output[state] += score
+
+        # failure links, computed in breadth first order so the state a link points
+        # to always has its own output complete
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for word, next_state in self._goto[state].items():
+                fail = self._fail[state]
+
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+
+                self._fail[next_state] = self._goto[fail].get(word, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+                queue.append(next_state)
+
+    def score(self, tweet_txt: str) -> Tuple[float, str]:
+        """Return a sentiment score for the tweet by adding up the score of all
+        the words it contains which are in the lexicon, and its tag (positive,
+        neutral or negative)
+
+        @param tweet_txt: The tweet for which we want to analyze sentiments
+        @return: a sentiment score for the tweet and its tag
+        """
+        # our words are only lower-case so we have to covert the tweet into all lower-case.
+        text = str.lower(tweet_txt)
+
+        goto, fail, output = self._goto, self._fail, self._output
+
+        score_so_far = 0.0  # ACCUMULATOR: stores the sentiment score
+        state = 0
+
+        for word in text.split():
+            while state and word not in goto[state]:
+                state = fail[state]
+
+            state = goto[state].get(word, 0)
+            score_so_far += output[state]
+
+        return (score_so_far, sentiment_tag(score_so_far))
+
+    def score_many(self, texts: Iterable[str], workers: int = 1,
+                   vectorized: bool = False) -> List[Tuple[float, str]]:
+        """Return the sentiment score and tag of every tweet in <texts>, in order
+
+        @param texts: the tweets for which we want to analyze sentiments
+        @param workers: number of processes used to score the tweets (see scoring_pool)
+        @param vectorized: if the tweets are scored with score_array instead of one by one
+        @return: list of (score, tag) tuples
+        """
+        if workers <= 1 and vectorized:
+            scores, tags = self.score_array(list(texts))
+            return list(zip(scores.tolist(), tags.tolist()))
+        elif workers <= 1:
+            return [self.score(text) for text in texts]
+
+        with scoring_pool(self, workers) as executor:
+            return score_in_pool(executor, list(texts), vectorized=vectorized)
+
+    def score_array(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the sentiment scores and tags of all the tweets in <texts>, computed
+        together with numpy. The scores are the same as the ones of score, except that
+        they may be added up in another order, so the last digits can differ.
+
+        The words of all the tweets are turned into one array of word ids, with 0 for
+        the words which are in no entry, and the offsets of the tweets in this array give
+        the tweet of every word. The scores of the single words are read from an array
+        indexed by word id. Then, starting from the positions of the words which start
+        longer entries, the hash of the next n words (all in the same tweet) is looked up
+        in the table of the starts of entries of n words, for n = 2, 3, ... as long as
+        some positions still match the start of an entry. The scores of the words and
+        entries found are added up for each tweet with np.bincount.
+
+        @param texts: the tweets for which we want to analyze sentiments
+        @return: array of the scores and array of the tags of the tweets
+        """
+        if self._word_ids is None:
+            self._build_entry_tables()
+
+        tweet_words = [str.split(str.lower(text)) for text in texts]
+        lengths = np.fromiter(map(len, tweet_words), dtype=np.int64, count=len(tweet_words))
+        ids = np.fromiter(map(self._word_ids.get, chain.from_iterable(tweet_words), repeat(0)),
+                          dtype=np.int64, count=int(lengths.sum()))
+
+        # the tweet of every word, and the offset of the end of this tweet in ids
+        tweet_of_word = np.repeat(np.arange(len(texts)), lengths)
+        tweet_end = np.cumsum(lengths)[tweet_of_word]
+        word_scores = self._single_scores[ids]
+
+        # positions where an entry of more than one word may start, and the hash of the
+        # words from there which have matched the start of an entry so far
+        starts = np.flatnonzero(self._starts_entry[ids])
+        hashes = ids[starts].astype(np.uint64)
+
+        for n, (entry_hashes, entry_scores) in enumerate(self._entry_tables, start=2):
+            inside = starts + n - 1 < tweet_end[starts]
+            starts = starts[inside]
+            hashes = hashes[inside] * HASH_MULTIPLIER + ids[starts + n - 1].astype(np.uint64)
+
+            found = np.minimum(np.searchsorted(entry_hashes, hashes), len(entry_hashes) - 1)
+            matches = entry_hashes[found] == hashes
+
+            starts, hashes, found = starts[matches], hashes[matches], found[matches]
+
+            if len(starts) == 0:
+                break
+
+            word_scores[starts] += entry_scores[found]
+
+        scores = np.bincount(tweet_of_word, weights=word_scores, minlength=len(texts))
+        tags = np.where(scores >= .5, 'positive', np.where(scores <= -.25, 'negative', 'neutral'))
+
+        return scores, tags
+
+    def _build_entry_tables(self) -> None:
+        """Build the word ids, the arrays indexed by word id and the tables of hashes
+        of the starts of entries used by score_array"""
+        self._word_ids = {}
+        entries = []
+
+        for entry, score in self.scores.items():
+            ids = [self._word_ids.setdefault(word, len(self._word_ids) + 1) for word in entry.split(' ')]
+            entries.append((ids, score))
+
+        self._single_scores = np.zeros(len(self._word_ids) + 1)
+        self._starts_entry = np.zeros(len(self._word_ids) + 1, dtype=bool)
+
+        # for every n from 2, the scores of the first n words of all the entries
+        # of n words or more (0 if the first n words are not an entry themselves)
+        starts = []
+
+        for ids, score in entries:
+            if len(ids) == 1:
+                self._single_scores[ids[0]] = score
+                continue
+
+            self._starts_entry[ids[0]] = True
+
+            while len(starts) < len(ids) - 1:
+                starts.append({})
+
+            for n in range(2, len(ids) + 1):
+                starts[n - 2].setdefault(hash_word_ids(ids[:n]), 0.0)
+
+            starts[len(ids) - 2][hash_word_ids(ids)] = score
+
+        self._entry_tables = []
+
+        for table in starts:
+            entry_hashes = np.array(list(table), dtype=np.uint64)
+            order = np.argsort(entry_hashes)
+            self._entry_tables.append((entry_hashes[order], np.array(list(table.values()))[order]))
+
+
+# multiplier of the hash of a sequence of word ids, an odd number so no information is
+# lost in every step; the products wrap around at 2 ** 64 like the numpy uint64 arrays
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash_word_ids(ids: List[int]) -> int:
+    """Return the hash of the sequence of word <ids> used in the tables of score_array,
+    which is the same as the one computed with numpy in score_array"""
+    hash_so_far = 0  # ACCUMULATOR: stores the hash of the ids so far
+
+    for word_id in ids:
+        hash_so_far = (hash_so_far * int(HASH_MULTIPLIER) + word_id) % 2 ** 64
+
+    return hash_so_far
+
+
+class LexiconHolder:
+    """
+    A Lexicon kept by this module between calls to its functions.
 
-    for word in text.split():
-        if word in refined_list:
-            score_so_far += refined_list[word]
+    Instance Attributes:
+    - lexicon: the lexicon kept, or None if there is none yet
+    - words: the dict of words the lexicon was built from, or None if it is not known
+    - size: the number of words in <words> when the lexicon was built
+
+    Representation Invariants:
+    - self.words is None or self.lexicon is not None
+    """
+    lexicon: Optional[Lexicon]
+    words: Optional[Dict[str, float]]
+    size: int
+
+    def __init__(self) -> None:
+        """Initialize a holder without a lexicon"""
+        self.lexicon = None
+        self.words = None
+        self.size = 0
+
+    def keep(self, lexicon: Lexicon, words: Optional[Dict[str, float]] = None) -> None:
+        """Keep <lexicon>, built from the dict <words> if it is known"""
+        self.lexicon = lexicon
+        self.words = words
+        self.size = len(words) if words is not None else 0
+
+
+# the lexicon used by the scoring processes of scoring_pool
+WORKER_LEXICON = LexiconHolder()
+
+# the lexicon built by analyze_sentiments from the last dict of words it was called with
+LAST_LEXICON = LexiconHolder()
+
+
+def scoring_pool(lexicon: Lexicon, workers: int) -> ProcessPoolExecutor:
+    """Return a pool of <workers> processes which score tweets with <lexicon>.
+
+    Where possible the processes are forked, so they share the lexicon already built
+    in this process instead of receiving a copy of it. Otherwise the lexicon is sent
+    once to every process when it starts.
+
+    @param lexicon: the lexicon used for scoring
+    @param workers: number of processes in the pool
+    @return: the pool, to be used with score_in_pool
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=set_worker_lexicon, initargs=(lexicon,))
+
+
+def set_worker_lexicon(lexicon: Lexicon) -> None:
+    """Keep <lexicon> as the lexicon of this scoring process"""
+    WORKER_LEXICON.keep(lexicon)
+
+
+def score_chunk(texts: List[str], vectorized: bool = False) -> List[Tuple[float, str]]:
+    """Return the sentiment score and tag of every tweet in <texts>, using the lexicon
+    of this scoring process"""
+    return WORKER_LEXICON.lexicon.score_many(texts, vectorized=vectorized)
+
+
+def score_in_pool(executor: ProcessPoolExecutor,
+                  texts: List[str],
+                  chunk_size: int = 2000,
+                  vectorized: bool = False) -> List[Tuple[float, str]]:
+    """Return the sentiment score and tag of every tweet in <texts>, in order, scoring
+    chunks of <chunk_size> tweets in the processes of a pool made by scoring_pool
+
+    @param executor: the pool of scoring processes
+    @param texts: the tweets for which we want to analyze sentiments
+    @param chunk_size: the number of tweets sent to a process at once
+    @param vectorized: if the processes score the tweets with Lexicon.score_array
+    @return: list of (score, tag) tuples
+    """
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+
+    return [result for chunk in executor.map(score_chunk, chunks, repeat(vectorized)) for result in chunk]
+
+
+def sentiment_tag(score: float) -> str:
+    """Return 'positive', 'negative' or 'neutral' depending on the sentiment <score>"""
+    if score >= .5:
+        return 'positive'
+    elif score <= -.25:
+        return 'negative'
+    else:
+        return 'neutral'
+
+
+def analyze_sentiments(tweet_txt: str, words_list: Union[Lexicon, Dict[str, float]]) -> Tuple[float, str]:
+    """ Returns a sentiment score for the tweet by adding up the score of all
+    the words it contains which are in the words list.
+
+    The words list should be a Lexicon, so it is only prepared once for all the
+    tweets. If it is a dict, the Lexicon built from it is kept (see LAST_LEXICON), and
+    it is only built again when the function is called with another dict.
+
+    @param tweet_txt: The tweet for which we want to analyze sentiments
+    @param words_list: the list of words with their sentiment scores
+    @return: a sentiment score for the tweet
+
+    Preconditions:
+    - if words_list is a dict, it is not changed between calls with the same dict
+    """
+    if not isinstance(words_list, Lexicon):
+        if LAST_LEXICON.words is not words_list or LAST_LEXICON.size != len(words_list):
+            LAST_LEXICON.keep(Lexicon(words_list), words_list)
 
-    if score_so_far >= .5:
-        tag = 'positive'
-    elif score_so_far <= -.25:
-        tag = 'negative'
+        words_list = LAST_LEXICON.lexicon
 
-    return (score_so_far, tag)
+    return words_list.score(tweet_txt)
 
 
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'extra-imports': ['datetime',
+        'extra-imports': ['collections',
+                          'concurrent.futures',
+                          'multiprocessing',
+                          'itertools',
                           'csv',
-                          'ast',
-                          'typing'],
-        'allowed-io': ['add_sentiments_to_data', 'extract_words'],
+                          'hashlib',
+                          'json',
+                          'marshal',
+                          'os',
+                          'typing',
+                          'numpy',
+                          'data_manager',
+                          'sentiment_rollup'],
+        'allowed-io': ['add_sentiments_to_data', 'extract_words', 'read_words_cache', 'write_words_cache',
+                       'read_checkpoint', 'write_checkpoint', 'read_tweet_keys'],
         'max-line-length': 150,
         'disable': ['R1705', 'C0200']
     })
@@ -0,0 +1,331 @@
+"""
+This file measures how fast tweets are scored, so the speed of the sentiment
+analysis can be compared between versions of the project.
+
+Synthetic datasets of tweets (by default with 10 000, 100 000 and 1 000 000 tweets)
+are made with the words of the SentiWords dataset, in the same format as the
+dataset made by get_data. For every dataset we measure the number of tweets scored
+per second with analyze_sentiments (one by one and with numpy), the time taken by
+add_sentiments_to_data, the speed at which the rows of the new dataset are written
+and the peak memory used. The time taken to load the words is also measured.
+
+Every phase (scoring, add_sentiments_to_data and writing) is measured in a new
+process, so the peak memory of one phase does not include the memory used by the
+others or by the previous datasets. The results are saved as a json
+file named after the current git commit, for example:
+
+    from benchmark_sentiments import run_benchmarks
+    run_benchmarks('datasets/SentiWords_1.1.txt')
+
+References:
+- https://docs.python.org/3/library/resource.html
+- https://docs.python.org/3/library/time.html#time.perf_counter
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # the resource module is only on Unix
+    resource = None
+
+from analyze_sentiments import Lexicon, add_sentiments_to_data, extract_words
+
+# number of tweets in the synthetic datasets
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+# words in tweets which are not in the SentiWords dataset
+FILLER_WORDS = ['#climatechange', '#globalwarming', '#actonclimate', '@un', '@nasa', 'rt',
+                'https://t.co/ab12cd34', '2020', '&amp;', '...', 'co2', 'ipcc', 'cop26', '🌍']
+
+
+def run_benchmarks(words_list: str,
+                   sizes: Iterable[int] = DEFAULT_SIZES,
+                   output_path: Optional[str] = None,
+                   seed: int = 110) -> Dict[str, Any]:
+    """Measure the speed of the sentiment analysis on synthetic datasets with <sizes>
+    tweets, and save the results as json at <output_path> (by default
+    benchmarks/sentiments-<commit>.json).
+
+    @param words_list: the path for the dataset with words for calculating sentiment score
+    @param sizes: the number of tweets of every synthetic dataset
+    @param output_path: the path of the json file with the results
+    @param seed: seed of the random generator used to make the datasets
+    @return: dict of the results, as saved in the json file
+    """
+    commit = git_commit()
+
+    results = {'commit': commit,
+               'date': datetime.now().isoformat(timespec='seconds'),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'cpus': os.cpu_count(),
+               'lexicon': run_in_new_process(benchmark_lexicon, words_list),
+               'datasets': [benchmark_dataset(words_list, size, seed) for size in sizes]}
+
+    if output_path is None:
+        output_path = os.path.join('benchmarks', f'sentiments-{(commit or "unknown")[:10]}.json')
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    with open(output_path, 'w') as file:
+        json.dump(results, file, indent=2)
+
+    return results
+
+
+def benchmark_lexicon(words_list: str) -> Dict[str, Any]:
+    """Return the time taken to load the words of <words_list> and prepare them for
+    scoring, without and with the compiled file made by extract_words
+
+    @param words_list: the path for the dataset with words for calculating sentiment score
+    @return: dict mapping the name of every measure to its value
+    """
+    start = time.perf_counter()
+    words = extract_words(words_list, use_cache=False)
+    parse_time = time.perf_counter() - start
+
+    extract_words(words_list)  # makes sure the compiled file is there
+
+    start = time.perf_counter()
+    extract_words(words_list)
+    cached_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lexicon = Lexicon(words)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lexicon.score_array([])  # builds the tables used by score_array
+    tables_time = time.perf_counter() - start
+
+    return {'words': len(words),
+            'extract_words_seconds': parse_time,
+            'extract_words_cached_seconds': cached_time,
+            'lexicon_build_seconds': build_time,
+            'vectorized_tables_seconds': tables_time,
+            'peak_rss_mb': peak_rss_mb()}
+
+
+def benchmark_dataset(words_list: str, size: int, seed: int) -> Dict[str, Any]:
+    """Return the speed of the sentiment analysis on a synthetic dataset of <size> tweets.
+
+    Scoring, add_sentiments_to_data and writing the new dataset are every one measured
+    in a new process, so the peak memory of every phase only includes its own work.
+
+    @param words_list: the path for the dataset with words for calculating sentiment score
+    @param size: the number of tweets of the dataset
+    @param seed: seed of the random generator used to make the dataset
+    @return: dict mapping the name of every measure to its value
+    """
+    directory = tempfile.mkdtemp(prefix='benchmark-sentiments-')
+
+    try:
+        input_path = os.path.join(directory, 'tweets.csv')
+        output_path = os.path.join(directory, 'tweets-sentiment.csv')
+
+        write_synthetic_tweets(input_path, Lexicon(extract_words(words_list)), size, seed)
+
+        results = {'tweets': size, 'input_mb': os.path.getsize(input_path) / 2 ** 20}
+        results.update(run_in_new_process(benchmark_scoring, words_list, input_path))
+        results.update(run_in_new_process(benchmark_end_to_end, words_list, input_path, output_path))
+        results.update(run_in_new_process(benchmark_write, output_path, os.path.join(directory, 'copy.csv')))
+
+        results['tweets_per_second'] = size / results['score_seconds']
+        results['vectorized_tweets_per_second'] = size / results['vectorized_score_seconds']
+        results['end_to_end_tweets_per_second'] = size / results['end_to_end_seconds']
+
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def benchmark_scoring(words_list: str, input_path: str) -> Dict[str, Any]:
+    """Return the time taken to score the tweets of the dataset at <input_path> one by
+    one and with numpy, and the peak memory used
+
+    @param words_list: the path for the dataset with words for calculating sentiment score
+    @param input_path: the path of a dataset made by write_synthetic_tweets
+    @return: dict mapping the name of every measure to its value
+    """
+    lexicon = Lexicon(extract_words(words_list))
+    lexicon.score_array([])  # builds the tables used by score_array, which are timed in benchmark_lexicon
+
+    with open(input_path, newline='') as file:
+        reader = csv.reader(file)
+        next(reader)
+        texts = [row[0] for row in reader]
+
+    start = time.perf_counter()
+    lexicon.score_many(texts)
+    score_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lexicon.score_many(texts, vectorized=True)
+    vectorized_time = time.perf_counter() - start
+
+    return {'score_seconds': score_time,
+            'vectorized_score_seconds': vectorized_time,
+            'score_peak_rss_mb': peak_rss_mb()}
+
+
+def benchmark_end_to_end(words_list: str, input_path: str, output_path: str) -> Dict[str, Any]:
+    """Return the time taken by add_sentiments_to_data to make the dataset at
+    <output_path> from the dataset at <input_path>, and the peak memory used
+
+    @param words_list: the path for the dataset with words for calculating sentiment score
+    @param input_path: the path of a dataset made by write_synthetic_tweets
+    @param output_path: the path of the new dataset
+    @return: dict mapping the name of every measure to its value
+    """
+    start = time.perf_counter()
+    add_sentiments_to_data(input_path, words_list, output_path)
+    end_to_end_time = time.perf_counter() - start
+
+    return {'end_to_end_seconds': end_to_end_time,
+            'end_to_end_peak_rss_mb': peak_rss_mb(),
+            'output_mb': os.path.getsize(output_path) / 2 ** 20}
+
+
+def benchmark_write(output_path: str, copy_path: str) -> Dict[str, Any]:
+    """Return the speed at which the rows of the dataset made by add_sentiments_to_data
+    at <output_path> are written as csv at <copy_path>, and the peak memory used.
+    The rows are read before the time starts, so only the writing is measured.
+
+    @param output_path: the path of a dataset made by add_sentiments_to_data
+    @param copy_path: the path of the copy written
+    @return: dict mapping the name of every measure to its value
+    """
+    with open(output_path, newline='') as file:
+        rows = list(csv.reader(file))
+
+    start = time.perf_counter()
+
+    with open(copy_path, 'w', newline='') as file:
+        csv.writer(file).writerows(rows)
+
+    write_time = time.perf_counter() - start
+
+    return {'write_seconds': write_time,
+            'write_mb_per_second': os.path.getsize(copy_path) / 2 ** 20 / write_time,
+            'write_peak_rss_mb': peak_rss_mb()}
+
+
+def write_synthetic_tweets(path: str, lexicon: Lexicon, size: int, seed: int) -> None:
+    """Write a dataset of <size> synthetic tweets at <path>, in the same format as the
+    dataset made by get_data. About a third of the words of every tweet are words or
+    phrases of <lexicon>, and the others are common words of tweets which are not.
+
+    @param path: the path of the new dataset
+    @param lexicon: the words used for calculating sentiment score
+    @param size: the number of tweets
+    @param seed: seed of the random generator
+    """
+    generator = random.Random(seed)
+    entries = sorted(lexicon.scores)
+    created_at = datetime(2020, 11, 1)
+
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['tweet_text', 'all_hashtags', 'favorite_count', 'retweet_count',
+                         'created_at', 'username', 'followers_count', 'location'])
+
+        for _ in range(size):
+            words = [generator.choice(entries) if generator.random() < 1 / 3 else generator.choice(FILLER_WORDS)
+                     for _ in range(generator.randint(5, 30))]
+            hashtags = [{'text': word[1:], 'indices': [0, len(word)]} for word in words if word.startswith('#')]
+            created_at += timedelta(seconds=generator.randint(0, 30))
+
+            writer.writerow([' '.join(words),
+                             str(hashtags),
+                             generator.randint(0, 50),
+                             generator.randint(0, 20),
+                             created_at,
+                             f'user{generator.randint(0, size // 10)}',
+                             generator.randint(0, 10_000),
+                             ''])
+
+
+def run_in_new_process(function: Any, *args: Any) -> Dict[str, Any]:
+    """Return function(*args), called in a new process started from scratch, so its
+    peak memory only includes its own work"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(function, *args).result()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Return the peak memory used by this process in megabytes, or None if it can not
+    be measured on this platform"""
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # the peak is in bytes on macOS and in kilobytes on other systems
+    return peak / 2 ** 20 if platform.system() == 'Darwin' else peak / 2 ** 10
+
+
+def git_commit() -> Optional[str]:
+    """Return the hash of the current git commit, or None if it can not be found"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(paths: List[str]) -> None:
+    """Print the tweets per second of the results saved at <paths>, side by side,
+    for every size of dataset
+
+    @param paths: the paths of json files saved by run_benchmarks
+    """
+    results = []
+
+    for path in paths:
+        with open(path) as file:
+            results.append(json.load(file))
+
+    print('tweets'.rjust(10), *[(result['commit'] or 'unknown')[:10].rjust(12) for result in results])
+
+    for index, dataset in enumerate(results[0]['datasets']):
+        speeds = [f'{result["datasets"][index]["tweets_per_second"]:12.0f}' for result in results
+                  if index < len(result['datasets'])]
+        print(str(dataset['tweets']).rjust(10), *speeds)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['concurrent.futures',
+                          'datetime',
+                          'typing',
+                          'csv',
+                          'json',
+                          'multiprocessing',
+                          'os',
+                          'platform',
+                          'random',
+                          'resource',
+                          'shutil',
+                          'subprocess',
+                          'tempfile',
+                          'time',
+                          'analyze_sentiments'],
+        'allowed-io': ['run_benchmarks', 'benchmark_scoring', 'benchmark_write', 'write_synthetic_tweets', 'compare_results'],
+        'max-line-length': 150,
+        'disable': ['R1705', 'C0200']
+    })
@@ -3,10 +3,18 @@ This file will be used to handle all the data
 """
 
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Callable
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 from pprint import pprint
 import csv
 import ast
+import io
+import locale
+import os
+
+import numpy as np
 
 
 class Dataset:
@@ -18,29 +26,65 @@ class Dataset:
     - self._filepath != ''
     - all(datatype in [int, float, str, datetime, list, bool] for datatype in self._types)
 
+    Selecting and deleting columns does not copy the rows: the dataset becomes a
+    view which keeps the original rows and the list of columns it shows, and the
+    rows are only rebuilt when they are needed as lists (for example by get()).
+    Filters only keep references to the original rows.
+
     Private Instance Attributes:
     - _dataset : consist of the dataset
     - _filepath: path to the dataset
+    - _column_map: position in the rows of self._dataset of every column of the dataset,
+                   or None if the rows have exactly the columns of the dataset
+    - _width: number of values in the rows of self._dataset when there are no rows left
+              (see _row_width), or None if it is not known
+    - _indexes: dict mapping every indexed column to the kind of its index
+    - _index_data: dict mapping indexed columns to their built index (see build_index),
+                   which follows the rows when they are filtered, and is removed when
+                   the values change and built again when needed
     """
 
     _filepath: str
     _dataset: List[List]
+    _column_map: Optional[List[int]]
+    _width: Optional[int]
+    _indexes: Dict[int, str]
+    _index_data: Dict[int, Any]
 
     def __init__(self, filepath: Optional[str] = None,
                  types: Optional[list] = None,
-                 dataset: Optional[List[list]] = None) -> None:
+                 dataset: Optional[List[list]] = None,
+                 usecols: Optional[List[int]] = None,
+                 where: Optional[Any] = None,
+                 workers: int = 1) -> None:
         """Initialize a new dataset
 
         @param filepath: path of the dataset
         @param dataset: if we do not want to load from filepath and already have a dataset
         @param types: data types to which columns of dataset need to be converted
+        @param usecols: the columns of the file we want to load, all of them if None
+        @param where: predicate function or dict mapping a column of the file to its allowed
+                      values, used to only load some rows (see read_rows)
+        @param workers: number of processes used to read and convert the file (see load_parallel)
 
         Preconditions:
         - (filepath or dataset) and not (filepath and dataset)
+        - workers >= 1
         """
-        if filepath:
+        self._column_map = None
+        self._width = None
+        self._indexes = {}
+        self._index_data = {}
+
+        if filepath and workers > 1:
             self._filepath = filepath
-            self.load_data()
+            self._width = header_width(filepath, usecols)
+            self._dataset = [row for chunk in load_parallel(filepath, workers, usecols, where, types)
+                             for row in chunk]
+
+        elif filepath:
+            self._filepath = filepath
+            self.load_data(usecols, where)
 
             if types:
                 self.transform(types)
@@ -50,19 +94,41 @@ class Dataset:
 
     def get(self) -> List[List]:
         """Return self._dataset"""
+        self.materialize()
         return self._dataset
 
-    def load_data(self) -> None:
+    def materialize(self) -> None:
+        """Rebuild the rows of self._dataset with only the columns of the dataset,
+        if columns were selected or deleted since they were last built"""
+        if self._column_map is not None:
+            self._dataset = [[row[column] for column in self._column_map] for row in self._dataset]
+            self._width = len(self._column_map)
+            self._column_map = None
+
+    def _position(self, column: int) -> int:
+        """Return the position of column <column> in the rows of self._dataset"""
+        return column if self._column_map is None else self._column_map[column]
+
+    def _row_width(self) -> Optional[int]:
+        """Return the number of values in the rows of self._dataset, which is still
+        known when a filter kept no rows, or None if it is not known"""
+        return len(self._dataset[0]) if self._dataset else self._width
+
+    def load_data(self,
+                  usecols: Optional[List[int]] = None,
+                  where: Optional[Any] = None) -> None:
         """
         Load the data as list of lists and store it in
         self._dataset
+
+        @param usecols: the columns of the file we want to load, all of them if None
+        @param where: predicate function or dict mapping a column of the file to its allowed
+                      values, used to only load some rows (see read_rows)
         """
         with open(self._filepath) as file:
-            reader = csv.reader(file)
-
-            next(reader)  # skip the header row
+            self._dataset = list(read_rows(file, usecols, where))
 
-            self._dataset = [list(row) for row in reader]
+        self._width = header_width(self._filepath, usecols)
 
     def transform(self,
                   types: list,
@@ -75,8 +141,13 @@ class Dataset:
         @param year_only: if we just want the year from datetime object
         @param day_only: if we just want the day from datetime object
         """
-        self._dataset = [convert_datatype_for_row(row, types, year_only, day_only)
-                         for row in self._dataset]
+        # the selected columns are read straight from the original rows while converting
+        columns = None if self._column_map is None else tuple(self._column_map)
+        convert = compile_row_converter(tuple(types), year_only, day_only, columns)
+        self._dataset = list(map(convert, self._dataset))
+        self._width = len(columns) if columns is not None else self._width
+        self._column_map = None
+        self._data_changed()
 
     def filter_by_value(self,
                         column: int,
@@ -88,8 +159,28 @@ class Dataset:
         @param column: the column with which we want to filter
         @param values: the list of values with column could have
         """
-        self._dataset = [row for row in self._dataset
-                         if row[column] in values]
+        if column in self._indexes:
+            self.take(self.lookup(column, values))
+        else:
+            position = self._position(column)
+            values = as_lookup(values)
+            self._keep_rows(lambda row: row[position] in values)
+
+    def filter_range(self, column: int, low: Any, high: Any) -> None:
+        """
+        Change self._dataset to a filtered dataset, with rows in which column <column>
+        has a value between <low> and <high> (both included). If the column has a sorted
+        index the rows are found by binary search instead of checking every row.
+
+        @param column: the column with which we want to filter
+        @param low: the smallest value the column could have
+        @param high: the largest value the column could have
+        """
+        if self._indexes.get(column) == 'sorted':
+            self.take(self.lookup_range(column, low, high))
+        else:
+            position = self._position(column)
+            self._keep_rows(lambda row: low <= row[position] <= high)
 
     def filter_by_function(self,
                            filter_function: Any) -> None:
@@ -99,15 +190,29 @@ class Dataset:
 
         @param filter_function: the predicate function used for filtering
         """
-
-        self._dataset = [row for row in self._dataset
-                         if filter_function(row)]
+        self.materialize()
+        self._keep_rows(filter_function)
 
     def remove_na(self) -> None:
         """Change self._dataset to a dataset with all the rows with
         None values and empty strings removed
         """
-        self.filter_by_function(has_na)
+        if self._column_map is None:
+            self.filter_by_function(has_na)
+        else:
+            # only the columns of the view are checked, without building its rows
+            columns = self._column_map
+            self._keep_rows(lambda row: has_na([row[column] for column in columns]))
+
+    def _keep_rows(self, predicate: Callable[[list], bool]) -> None:
+        """Change self._dataset to only keep the rows satisfying <predicate>. If indexes
+        are built, they are moved to the new positions of the rows kept."""
+        if self._index_data:
+            self.take([position for position, row in enumerate(self._dataset) if predicate(row)])
+        else:
+            self._width = self._row_width()
+            self._dataset = [row for row in self._dataset if predicate(row)]
+            self._data_changed()
 
     def select(self, selected_columns: List[int]) -> None:
         """Change self._dataset to a dataset with only the columns in the
@@ -115,27 +220,46 @@ class Dataset:
 
         @param selected_columns: the columns we want to keep
         """
-        self._dataset = [[row[column] for column in selected_columns] for row in self._dataset]
+        self._column_map = [self._position(column) for column in selected_columns]
+        self._data_changed(selected_columns)
 
     def delete(self, selected_columns: List[int]) -> None:
         """Change self._dataset to a dataset with all the columns
         in <selected_columns> removed
 
         @param selected_columns: the columns we want to delete
+
+        The columns are still known when a filter kept no rows:
+
+        >>> data = Dataset(dataset=[['a', 1, 'x']])
+        >>> data.filter_by_value(0, ['zz'])
+        >>> data.delete([2])
+        >>> data.filter_by_value(1, [1])
+        >>> data.get()
+        []
         """
-        self._dataset = [[row[column] for column in range(len(row))
-                          if column not in selected_columns] for row in self._dataset]
+        width = self._row_width() if self._column_map is None else len(self._column_map)
+
+        if width is None:
+            return  # there are no rows, and no columns are known to delete
+
+        kept_columns = [column for column in range(width) if column not in selected_columns]
+        self._column_map = [self._position(column) for column in kept_columns]
+        self._data_changed(kept_columns)
 
     def head(self, nrows: Optional[int] = 5) -> None:
         """Print the first <n> rows of  self._dataset"""
         print_data = []
         for i in range(nrows):
-            print_data.append(self._dataset[i])
+            row = self._dataset[i]
+            positions = range(len(row)) if self._column_map is None else self._column_map
+            print_data.append([row[position] for position in positions])
         pprint(print_data)
 
     def unique(self, column: int) -> set:
         """Return a list of unique values for the column <column> in self._dataset"""
-        return {row[column] for row in self._dataset}
+        position = self._position(column)
+        return {row[position] for row in self._dataset}
 
     def calc_avg_col(self, column: int) -> float:
         """Return the average for a column of self._dataset
@@ -143,15 +267,113 @@ class Dataset:
         @param column: the column for which we want the average
         @return: average of the column <column>
         """
-        return sum([row[column] for row in self._dataset]) / len(self._dataset)
+        return sum(self.extract_column(column)) / len(self._dataset)
 
     def extract_column(self, column: int) -> list:
         """Return a column of self._dataset"""
-        return [row[column] for row in self._dataset]
+        position = self._position(column)
+        return [row[position] for row in self._dataset]
 
     def push(self, row: list) -> None:
         """Add row to the dataset"""
+        self.materialize()
         self._dataset.append(row)
+        self._data_changed()
+
+    def take(self, rows: List[int]) -> None:
+        """Change self._dataset to a dataset with only the rows at the positions in <rows>
+
+        @param rows: positions of the rows we want to keep, in the order we want them
+        """
+        rows = list(rows)
+        self._width = self._row_width()
+        self._dataset = [self._dataset[row] for row in rows]
+        self._data_changed(rows=rows)
+
+    def create_index(self, column: int, kind: str = 'hash') -> None:
+        """Add an index on the column <column>, which is used by filter_by_value
+        (and filter_range for sorted indexes) instead of checking every row.
+
+        A 'hash' index maps every value to the rows having it, and a 'sorted' index
+        keeps the values in order so ranges of values can be found with binary search.
+        The index is built the first time it is used, and it is kept when the dataset
+        is filtered (the rows it points to are moved to their new positions), so later
+        filters and lookups do not build it again.
+
+        @param column: the column we want to index
+        @param kind: 'hash' or 'sorted'
+        """
+        if kind not in ('hash', 'sorted'):
+            raise ValueError(f"unknown index kind {kind}, expected 'hash' or 'sorted'")
+
+        self._indexes[column] = kind
+        self._index_data.pop(column, None)
+
+    def lookup(self, column: int, values: list) -> List[int]:
+        """Return the positions, in order, of the rows in which column <column>
+        has a value in <values>, using the index of the column if there is one
+
+        @param column: the column in which we look for the values
+        @param values: the list of values we look for
+        """
+        index = self._get_index(column)
+
+        if index is None:
+            values = as_lookup(values)
+            return [row for row, value in enumerate(self.extract_column(column)) if value in values]
+        elif self._indexes[column] == 'hash':
+            codes, order, starts = index
+            parts = [order[starts[codes[value]]:starts[codes[value] + 1]]
+                     for value in as_lookup(values) if value in codes]
+        else:
+            keys, order = index
+            parts = [sorted_index_rows(keys, order, value) for value in as_lookup(values)]
+
+        return np.sort(np.concatenate(parts)).tolist() if parts else []
+
+    def lookup_range(self, column: int, low: Any, high: Any) -> List[int]:
+        """Return the positions, in order, of the rows in which column <column>
+        has a value between <low> and <high> (both included)
+
+        Preconditions:
+        - self._indexes[column] == 'sorted'
+        """
+        keys, order = self._get_index(column)
+
+        return np.sort(order[np.searchsorted(keys, low, 'left'):np.searchsorted(keys, high, 'right')]).tolist()
+
+    def _get_index(self, column: int) -> Any:
+        """Return the index of column <column>, building it if it was not built
+        since the values changed, or None if the column is not indexed"""
+        if column not in self._indexes:
+            return None
+
+        if column not in self._index_data:
+            self._index_data[column] = build_index(self._indexes[column], self.extract_column(column))
+
+        return self._index_data[column]
+
+    def _data_changed(self, columns: Optional[List[int]] = None, rows: Optional[Any] = None) -> None:
+        """Update the built indexes after the data changed.
+
+        If only some rows were kept, <rows> gives the old position of every new row,
+        and the built indexes are moved to the new positions of the rows. If the columns
+        changed, <columns> gives the old position of every new column, and the indexes
+        follow the columns to their new position. Otherwise the values may have changed,
+        so the built indexes are removed."""
+        if rows is not None:
+            remapped = {column: remap_index(self._indexes[column], index, rows)
+                        for column, index in self._index_data.items()}
+            self._index_data = {column: index for column, index in remapped.items() if index is not None}
+        elif columns is not None:
+            self._index_data = {new: self._index_data[old] for new, old in enumerate(columns)
+                                if old in self._index_data}
+        else:
+            self._index_data = {}
+
+        if columns is not None:
+            self._indexes = {new: self._indexes[old] for new, old in enumerate(columns)
+                             if old in self._indexes}
 
     def calculate_average(self,
                           grouping_column: int,
@@ -169,19 +391,834 @@ class Dataset:
         @return: List containing the average of column <avg_column> for every group of column
                  <grouping_column>
         """
-        values = []
-        group = []
+        aggregations = {avg_column: ('mean',)}
+        aggregations[grouping_column] = aggregations.get(grouping_column, ()) + ('first',)
+
+        data = self.aggregate(grouping_column, aggregations, grouping_column_modifier)
+
+        # the groups are kept in the same order as the values returned by unique()
+        group = [data[value][grouping_column]['first'] for value in set(data)]
+        values = [data[value][avg_column]['mean'] for value in set(data)]
+
+        return [group, values]
+
+    def aggregate(self,
+                  by: Any,
+                  aggregations: Dict[int, tuple],
+                  by_modifier: Optional = None) -> Dict[Any, Dict[int, Dict[str, Any]]]:
+        """Group the data by the column <by> and calculate statistics of some columns for
+        every group, in a single pass over the rows and without copying them.
+
+        The statistics which can be calculated are the ones in AGGREGATES.
+
+        @param by: the column to group by, or a list of columns to group by all of them
+        @param aggregations: dict mapping a column to the tuple of statistics we want for it
+        @param by_modifier: function to group by modified value of the grouping column
+        @return: dict mapping every group to a dict mapping every column in <aggregations>
+                 to a dict mapping each statistic to its value
+
+        >>> data = Dataset(dataset=[['a', 1.0], ['b', 2.0], ['a', 3.0]])
+        >>> data.aggregate(0, {1: ('mean', 'max')})
+        {'a': {1: {'mean': 2.0, 'max': 3.0}}, 'b': {1: {'mean': 2.0, 'max': 2.0}}}
+        """
+        if self._column_map is not None and len(set(self._column_map)) < len(self._column_map):
+            self.materialize()
+
+        if self._column_map is None:
+            return aggregate_rows(self._dataset, by, aggregations, by_modifier)
+
+        # aggregate the original rows, and give the results their columns in the view
+        positions = {self._position(column): column for column in aggregations}
+        by_positions = self._position(by) if isinstance(by, int) else [self._position(column) for column in by]
+        data = aggregate_rows(self._dataset, by_positions,
+                              {self._position(column): stats for column, stats in aggregations.items()},
+                              by_modifier)
+
+        return {key: {positions[position]: result for position, result in results.items()}
+                for key, results in data.items()}
+
+
+class ColumnarDataset(Dataset):
+    """
+    A dataset which stores every column as its own typed numpy array instead of
+    a list of rows. It has the same public functions as Dataset, but filters are
+    computed as boolean masks and column operations as array slices, so no python
+    object is kept per row.
+
+    Representation Invariants:
+    - all(column.shape == self._columns[0].shape for column in self._columns)
+
+    Private Instance Attributes:
+    - _columns: one numpy array for every column of the dataset
+    """
+
+    _columns: List[np.ndarray]
+
+    def __init__(self, filepath: Optional[str] = None,
+                 types: Optional[list] = None,
+                 dataset: Optional[List[list]] = None,
+                 usecols: Optional[List[int]] = None,
+                 where: Optional[Any] = None,
+                 workers: int = 1,
+                 columns: Optional[List[np.ndarray]] = None) -> None:
+        """Initialize a new columnar dataset
+
+        @param filepath: path of the dataset
+        @param types: data types to which columns of dataset need to be converted
+        @param dataset: if we do not want to load from filepath and already have a dataset
+        @param usecols: the columns of the file we want to load, all of them if None
+        @param where: predicate function or dict mapping a column of the file to its allowed
+                      values, used to only load some rows (see read_rows)
+        @param workers: number of processes used to read and convert the file (see load_parallel)
+        @param columns: if we already have the data as a list of numpy arrays
+
+        Preconditions:
+        - exactly one of filepath, dataset and columns is given
+        - workers >= 1
+        """
+        self._columns = []
+        self._indexes = {}
+        self._index_data = {}
+
+        if filepath and workers > 1:
+            self._filepath = filepath
+            chunks = [chunk for chunk in load_parallel(filepath, workers, usecols, where, types, columnar=True)
+                      if chunk]
+
+            if chunks:
+                self._columns = [np.concatenate(parts) for parts in zip(*chunks)]
+            else:  # no row was kept, but the dataset still has its columns
+                self._columns = columns_from_rows([], header_width(filepath, usecols))
+
+                if types:
+                    self.transform(types)
+
+        elif filepath:
+            self._filepath = filepath
+            self.load_data(usecols, where)
+
+            if types:
+                self.transform(types)
+
+        if isinstance(dataset, list):
+            self._columns = columns_from_rows(dataset, len(types) if types else 0)
+
+        if columns is not None:
+            self._columns = list(columns)
+
+    def __len__(self) -> int:
+        """Return the number of rows in the dataset"""
+        return len(self._columns[0]) if self._columns else 0
+
+    def get(self) -> List[List]:
+        """Return the dataset as a list of lists"""
+        return [list(row) for row in zip(*[column.tolist() for column in self._columns])]
+
+    def get_columns(self) -> List[np.ndarray]:
+        """Return the numpy arrays holding every column of the dataset"""
+        return self._columns
+
+    def _column(self, column: int) -> np.ndarray:
+        """Return the array of the column <column>. A dataset made from no rows without
+        types does not know its columns, so all of them are empty, like in a Dataset."""
+        if not self._columns:
+            return column_to_array([])
+
+        return self._columns[column]
+
+    def load_data(self,
+                  usecols: Optional[List[int]] = None,
+                  where: Optional[Any] = None) -> None:
+        """
+        Load the data as one array of strings per column and store it
+        in self._columns
+
+        @param usecols: the columns of the file we want to load, all of them if None
+        @param where: predicate function or dict mapping a column of the file to its allowed
+                      values, used to only load some rows (see read_rows)
+        """
+        with open(self._filepath) as file:
+            self._columns = columns_from_rows(read_rows(file, usecols, where),
+                                              header_width(self._filepath, usecols))
+
+    def transform(self,
+                  types: list,
+                  year_only: Optional[bool] = False,
+                  day_only: Optional[bool] = False) -> None:
+        """
+        Convert the columns of self._columns to respective data types.
+
+        @param types: list of datatype objects
+        @param year_only: if we just want the year from datetime object
+        @param day_only: if we just want the day from datetime object
+        """
+        self._columns = [convert_datatype_for_column(column, datatype, year_only, day_only)
+                         for column, datatype in zip(self._columns, types)]
+        self._data_changed()
+
+    def filter_by_mask(self, mask: np.ndarray) -> None:
+        """Change self._columns to only keep the rows for which <mask> is True
+
+        @param mask: boolean array with one value for every row
+        """
+        rows = np.flatnonzero(mask) if self._index_data else None
+        self._columns = [column[mask] for column in self._columns]
+        self._data_changed(rows=rows)
+
+    def take(self, rows: List[int]) -> None:
+        """Change the dataset to a dataset with only the rows at the positions in <rows>
+
+        @param rows: positions of the rows we want to keep, in the order we want them
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        self._columns = [column[rows] for column in self._columns]
+        self._data_changed(rows=rows)
+
+    def filter_range(self, column: int, low: Any, high: Any) -> None:
+        """
+        Change the dataset to a filtered dataset, with rows in which column <column>
+        has a value between <low> and <high> (both included)
+
+        @param column: the column with which we want to filter
+        @param low: the smallest value the column could have
+        @param high: the largest value the column could have
+        """
+        if self._indexes.get(column) == 'sorted':
+            self.take(self.lookup_range(column, low, high))
+        else:
+            data = self._column(column)
+            self.filter_by_mask((data >= low) & (data <= high))
+
+    def filter_by_value(self,
+                        column: int,
+                        values: list) -> None:
+        """
+        Change the dataset to a filtered dataset, with rows in which column <column>
+        has a value in <value> list
+
+        @param column: the column with which we want to filter
+        @param values: the list of values with column could have
+        """
+        data = self._column(column)
+
+        if column in self._indexes:
+            self.take(self.lookup(column, values))
+        elif data.dtype == object:
+            values = as_lookup(values)
+            self.filter_by_mask(np.fromiter((value in values for value in data), dtype=bool, count=len(data)))
+        else:
+            # numpy would convert strings to the type of the column before comparing them
+            self.filter_by_mask(np.isin(data, [value for value in values if not isinstance(value, str)]))
+
+    def filter_by_function(self,
+                           filter_function: Any) -> None:
+        """
+        Change the dataset to a filtered dataset, with rows that satisfies the
+        predicate function <filter_function>.
+
+        @param filter_function: the predicate function used for filtering
+        """
+        self.filter_by_mask(np.fromiter((bool(filter_function(row)) for row in self.get()),
+                                        dtype=bool, count=len(self)))
+
+    def remove_na(self) -> None:
+        """Change the dataset to a dataset with all the rows with
+        None values and empty strings removed
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        for column in self._columns:
+            if column.dtype.kind == 'U':
+                mask &= column != ''
+            elif column.dtype == object:
+                mask &= np.fromiter((value is not None and value != '' for value in column),
+                                    dtype=bool, count=len(column))
+
+        self.filter_by_mask(mask)
+
+    def select(self, selected_columns: List[int]) -> None:
+        """Change the dataset to a dataset with only the columns in the
+         <selected_columns> list
+
+        @param selected_columns: the columns we want to keep
+        """
+        self._columns = [self._column(column) for column in selected_columns]
+        self._data_changed(selected_columns)
+
+    def delete(self, selected_columns: List[int]) -> None:
+        """Change the dataset to a dataset with all the columns
+        in <selected_columns> removed
+
+        @param selected_columns: the columns we want to delete
+        """
+        to_delete = set(selected_columns)
+        kept_columns = [column for column in range(len(self._columns)) if column not in to_delete]
+        self._columns = [self._columns[column] for column in kept_columns]
+        self._data_changed(kept_columns)
+
+    def head(self, nrows: Optional[int] = 5) -> None:
+        """Print the first <n> rows of the dataset"""
+        pprint([list(row) for row in zip(*[column[:nrows].tolist() for column in self._columns])])
+
+    def unique(self, column: int) -> set:
+        """Return a list of unique values for the column <column> in the dataset"""
+        return set(self._column(column).tolist())
+
+    def calc_avg_col(self, column: int) -> float:
+        """Return the average for a column of the dataset
+
+        @param column: the column for which we want the average
+        @return: average of the column <column>
+        """
+        return float(np.mean(self._column(column)))
+
+    def extract_column(self, column: int) -> list:
+        """Return a column of the dataset"""
+        return self._column(column).tolist()
+
+    def push(self, row: list) -> None:
+        """Add row to the dataset.
+
+        Every column is a fixed size array, so this copies the whole dataset and
+        should not be used to build a large dataset one row at a time.
+        """
+        if not self._columns:
+            self._columns = columns_from_rows([row])
+        else:
+            self._columns = [np.append(column, [value]) for column, value in zip(self._columns, row)]
+
+        self._data_changed()
+
+    def split_by_values(self, column: int, filter_values: Optional = None) -> Dict[Any, 'ColumnarDataset']:
+        """Group the data by different values of the column <column> and return a dict
+        with a ColumnarDataset of observations for every value of the column.
+
+        @param column: the column number to group by
+        @param filter_values: set of values for column we want to keep
+        @return: dict containing datasets with different values for the column
+        """
+        values, inverse = np.unique(self._column(column), return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(values)))
+
+        dict_so_far = {}
+        start = 0
+
+        for value, end in zip(values.tolist(), bounds.tolist()):
+            if not filter_values or value in filter_values:
+                rows = order[start:end]
+                dict_so_far[value] = ColumnarDataset(columns=[data[rows] for data in self._columns])
+            start = end
+
+        return dict_so_far
+
+    def calculate_average(self,
+                          grouping_column: int,
+                          avg_column: int,
+                          grouping_column_modifier: Optional = None) -> List[List]:
+        """The function groups the data by column <grouping column> of the dataset and then
+        calculate the average of column <avg_column> for every group and return the list of
+        those averages and list of values for grouping column
+
+        The groups are in the same order as Dataset.calculate_average would return them.
+
+        @param grouping_column: column with which we would group
+        @param avg_column: the column of which we want to compute average
+        @param grouping_column_modifier: function to group by modified value of the
+                                         grouping column
+
+        @return: List containing the average of column <avg_column> for every group of column
+                 <grouping_column>
+        """
+        keys = self._columns[grouping_column]
 
         if grouping_column_modifier:
-            data = group_by_function(self, grouping_column, grouping_column_modifier)
+            keys = np.array([grouping_column_modifier(value) for value in keys.tolist()])
+
+        values, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        sums = np.bincount(inverse, weights=self._columns[avg_column], minlength=len(values))
+        counts = np.bincount(inverse, minlength=len(values))
+        position = {value: index for index, value in enumerate(values.tolist())}
+
+        # like Dataset.calculate_average, every group is named by the value of
+        # the grouping column in the first row of that group
+        order = [position[value] for value in set(position)]
+        group = self._columns[grouping_column][first[order]].tolist()
+
+        return [group, (sums[order] / counts[order]).tolist()]
+
+    def aggregate(self,
+                  by: Any,
+                  aggregations: Dict[int, tuple],
+                  by_modifier: Optional = None) -> Dict[Any, Dict[int, Dict[str, Any]]]:
+        """Group the data by the column <by> and calculate statistics of some columns for
+        every group. Numeric columns are aggregated with numpy over all the groups at once.
+
+        @param by: the column to group by, or a list of columns to group by all of them
+        @param aggregations: dict mapping a column to the tuple of statistics we want for it
+        @param by_modifier: function to group by modified value of the grouping column
+        @return: dict mapping every group to a dict mapping every column in <aggregations>
+                 to a dict mapping each statistic to its value
+        """
+        numeric = all(self._columns[column].dtype.kind in 'iufb' or set(stats) == {'first'}
+                      for column, stats in aggregations.items())
+
+        if by_modifier or not numeric:
+            return aggregate_rows(self.get(), by, aggregations, by_modifier)
+
+        by_columns = [by] if isinstance(by, int) else list(by)
+        codes = np.zeros(len(self), dtype=np.int64)
+
+        for column in by_columns:
+            values, inverse = np.unique(self._columns[column], return_inverse=True)
+            codes = codes * len(values) + inverse
+
+        _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        sorted_rows = np.argsort(inverse, kind='stable')
+        counts = np.bincount(inverse)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        results = {}
+
+        for column, stats in aggregations.items():
+            data = self._columns[column]
+            results[column] = {}
+
+            for stat in stats:
+                if stat == 'count':
+                    results[column][stat] = counts
+                elif stat == 'sum':
+                    results[column][stat] = np.bincount(inverse, weights=data)
+                elif stat == 'mean':
+                    results[column][stat] = np.bincount(inverse, weights=data) / counts
+                elif stat == 'variance':
+                    mean = np.bincount(inverse, weights=data) / counts
+                    results[column][stat] = np.bincount(inverse, weights=(data - mean[inverse]) ** 2) / counts
+                elif stat == 'min':
+                    results[column][stat] = np.minimum.reduceat(data[sorted_rows], starts)
+                elif stat == 'max':
+                    results[column][stat] = np.maximum.reduceat(data[sorted_rows], starts)
+                elif stat == 'first':
+                    results[column][stat] = data[first]
+                else:
+                    raise ValueError(f'unknown statistic {stat}, expected one of {AGGREGATES}')
+
+        keys = list(zip(*[self._columns[column][first].tolist() for column in by_columns]))
+
+        if isinstance(by, int):
+            keys = [key[0] for key in keys]
+
+        # groups are returned in the order in which they first appear, like Dataset.aggregate
+        return {keys[group]: {column: {stat: results[column][stat][group].item() for stat in stats}
+                              for column, stats in aggregations.items()}
+                for group in np.argsort(first, kind='stable').tolist()}
+
+
+class LazyDataset(Dataset):
+    """
+    A dataset which does not load or change its data straight away. Calls to
+    delete, select, remove_na, transform, filter_by_value and filter_by_function
+    are only recorded in a plan, and the plan is run in one pass over the rows the
+    first time the data is needed (for example by get() or calculate_average).
+
+    While running the plan, filters are done before the type conversion of the
+    columns they do not need, so rows which are dropped are never fully converted
+    or copied.
+
+    Private Instance Attributes:
+    - _plan: list of (step, arguments) tuples which still have to be run
+    - _rows: the data the plan is run on, or None if it still has to be read from
+             self._filepath
+    - _usecols: the columns of the file which are read
+    - _where: the filter applied to the rows while reading the file
+    """
+
+    _plan: list
+    _rows: Optional[List[List]]
+    _usecols: Optional[List[int]]
+    _where: Optional[Any]
+
+    def __init__(self, filepath: Optional[str] = None,
+                 types: Optional[list] = None,
+                 dataset: Optional[List[list]] = None,
+                 usecols: Optional[List[int]] = None,
+                 where: Optional[Any] = None) -> None:
+        """Initialize a new lazy dataset
+
+        @param filepath: path of the dataset
+        @param types: data types to which columns of dataset need to be converted
+        @param dataset: if we do not want to load from filepath and already have a dataset
+        @param usecols: the columns of the file we want to load, all of them if None
+        @param where: predicate function or dict mapping a column of the file to its allowed
+                      values, used to only load some rows (see read_rows)
+
+        Preconditions:
+        - (filepath or dataset) and not (filepath and dataset)
+        """
+        self._plan = []
+        self._rows = None
+        self._usecols = usecols
+        self._where = where
+        self._column_map = None
+        self._width = None
+        self._indexes = {}
+        self._index_data = {}
+
+        if filepath:
+            self._filepath = filepath
+
+            if types:
+                self.transform(types)
+
+        if isinstance(dataset, list):
+            self._rows = dataset
+
+    @property
+    def _dataset(self) -> List[List]:
+        """Run the plan if needed and return the rows of the dataset"""
+        if self._rows is None or self._plan:
+            self.collect()
+        return self._rows
+
+    @_dataset.setter
+    def _dataset(self, rows: List[List]) -> None:
+        """Replace the rows of the dataset. The built indexes are updated by the
+        function replacing the rows (see _data_changed)."""
+        self._rows = rows
+        self._plan = []
+
+    def aggregate(self,
+                  by: Any,
+                  aggregations: Dict[int, tuple],
+                  by_modifier: Optional = None) -> Dict[Any, Dict[int, Dict[str, Any]]]:
+        """Group the data by the column <by> and calculate statistics of some columns for
+        every group. If the data was not loaded yet, the plan is run while aggregating,
+        without keeping the rows.
+
+        @param by: the column to group by, or a list of columns to group by all of them
+        @param aggregations: dict mapping a column to the tuple of statistics we want for it
+        @param by_modifier: function to group by modified value of the grouping column
+        @return: dict mapping every group to a dict mapping every column in <aggregations>
+                 to a dict mapping each statistic to its value
+        """
+        if self._rows is not None:
+            return aggregate_rows(self._dataset, by, aggregations, by_modifier)
+
+        return aggregate_rows(self.iter_rows(), by, aggregations, by_modifier)
+
+    def iter_rows(self) -> Iterator[list]:
+        """Yield the rows of the dataset one at a time, running the plan on them while
+        they are read, without keeping them in memory."""
+        if self._rows is not None:
+            # the plan may convert values in place, so the shared rows are copied first
+            yield from execute_plan(map(list, self._rows), self._plan)
         else:
-            data = group_by_values(self, grouping_column)
+            with open(self._filepath) as file:
+                yield from execute_plan(read_rows(file, self._usecols, self._where), self._plan)
+
+    def load_data(self,
+                  usecols: Optional[List[int]] = None,
+                  where: Optional[Any] = None) -> None:
+        """Forget the current rows, so they are read again from self._filepath
+        the next time the data is needed
+
+        @param usecols: the columns of the file we want to load, all of them if None
+        @param where: predicate function or dict mapping a column of the file to its allowed
+                      values, used to only load some rows (see read_rows)
+        """
+        self._rows = None
+        self._usecols = usecols
+        self._where = where
 
-        for i in data:
-            values.append(data[i].calc_avg_col(avg_column))
-            group.append(data[i].get()[0][grouping_column])
+    def collect(self) -> None:
+        """Run all the recorded steps in one pass over the rows"""
+        self._rows = list(self.iter_rows())
+        self._plan = []
+        self._index_data = {}
 
-        return [group, values]
+    def transform(self,
+                  types: list,
+                  year_only: Optional[bool] = False,
+                  day_only: Optional[bool] = False) -> None:
+        """
+        Record that the columns need to be converted to respective data types.
+
+        @param types: list of datatype objects
+        @param year_only: if we just want the year from datetime object
+        @param day_only: if we just want the day from datetime object
+        """
+        self._plan.append(('transform', (types, year_only, day_only)))
+
+    def filter_by_value(self,
+                        column: int,
+                        values: list) -> None:
+        """
+        Record that only rows in which column <column> has a value in <value> list
+        need to be kept
+
+        @param column: the column with which we want to filter
+        @param values: the list of values with column could have
+        """
+        if self._uses_index(column):
+            super().filter_by_value(column, values)
+        else:
+            self._plan.append(('filter_by_value', (column, values)))
+
+    def filter_range(self, column: int, low: Any, high: Any) -> None:
+        """
+        Record that only rows in which column <column> has a value between <low>
+        and <high> (both included) need to be kept
+
+        @param column: the column with which we want to filter
+        @param low: the smallest value the column could have
+        @param high: the largest value the column could have
+        """
+        if self._uses_index(column, 'sorted'):
+            super().filter_range(column, low, high)
+        else:
+            self._plan.append(('filter_range', (column, low, high)))
+
+    def _uses_index(self, column: int, kind: Optional[str] = None) -> bool:
+        """Return if a filter on column <column> is done with its index (of kind <kind>,
+        or of any kind if None) instead of being recorded. Indexes are only used once
+        the rows are loaded and all the recorded steps have been run, since the index
+        is built from the rows."""
+        return column in self._indexes and (kind is None or self._indexes[column] == kind) \
+            and self._rows is not None and not self._plan
+
+    def filter_by_function(self,
+                           filter_function: Any) -> None:
+        """
+        Record that only rows which satisfies the predicate function <filter_function>
+        need to be kept
+
+        @param filter_function: the predicate function used for filtering
+        """
+        self._plan.append(('filter_by_function', (filter_function,)))
+
+    def remove_na(self) -> None:
+        """Record that all the rows with None values and empty strings need to be removed"""
+        self._plan.append(('remove_na', ()))
+
+    def select(self, selected_columns: List[int]) -> None:
+        """Record that only the columns in the <selected_columns> list need to be kept
+
+        @param selected_columns: the columns we want to keep
+        """
+        self._plan.append(('select', (selected_columns,)))
+        self._indexes = {new: self._indexes[old] for new, old in enumerate(selected_columns)
+                         if old in self._indexes}
+
+    def delete(self, selected_columns: List[int]) -> None:
+        """Record that all the columns in <selected_columns> need to be removed
+
+        @param selected_columns: the columns we want to delete
+        """
+        self._plan.append(('delete', (selected_columns,)))
+        self._indexes = {column - sum(deleted < column for deleted in selected_columns): kind
+                         for column, kind in self._indexes.items() if column not in selected_columns}
+
+
+class StreamingDataset(LazyDataset):
+    """
+    A lazy dataset for files which are too large to be loaded in memory. The
+    recorded plan is run on the rows while they are read from the file, and the
+    rows are given in chunks of a fixed size (see iter_chunks) or reduced straight
+    away by unique, extract_column, calc_avg_col, aggregate and calculate_average,
+    so only one chunk of rows is kept in memory at a time.
+
+    Functions which need all the rows at once (like get()) still load the whole
+    dataset in memory, like a LazyDataset would.
+    """
+
+    def iter_chunks(self, size: int) -> Iterator[Dataset]:
+        """Yield the rows of the dataset in Dataset objects of <size> rows (the last one
+        can be smaller), after running the plan on them.
+
+        @param size: number of rows in a chunk
+
+        Preconditions:
+        - size > 0
+        """
+        rows = self.iter_rows()
+        chunk = list(islice(rows, size))
+
+        while chunk:
+            yield Dataset(dataset=chunk)
+            chunk = list(islice(rows, size))
+
+    def head(self, nrows: Optional[int] = 5) -> None:
+        """Print the first <n> rows of the dataset"""
+        pprint(list(islice(self.iter_rows(), nrows)))
+
+    def unique(self, column: int) -> set:
+        """Return a list of unique values for the column <column> in the dataset"""
+        return {row[column] for row in self.iter_rows()}
+
+    def calc_avg_col(self, column: int) -> float:
+        """Return the average for a column of the dataset
+
+        @param column: the column for which we want the average
+        @return: average of the column <column>
+        """
+        accumulator = Accumulator(('mean',))
+
+        for row in self.iter_rows():
+            accumulator.add(row[column])
+
+        return accumulator.result()['mean']
+
+    def extract_column(self, column: int) -> list:
+        """Return a column of the dataset, without keeping the other columns in memory"""
+        return [row[column] for row in self.iter_rows()]
+
+    def aggregate(self,
+                  by: Any,
+                  aggregations: Dict[int, tuple],
+                  by_modifier: Optional = None) -> Dict[Any, Dict[int, Dict[str, Any]]]:
+        """Group the data by the column <by> and calculate statistics of some columns for
+        every group, while streaming the rows of the dataset.
+
+        @param by: the column to group by, or a list of columns to group by all of them
+        @param aggregations: dict mapping a column to the tuple of statistics we want for it
+        @param by_modifier: function to group by modified value of the grouping column
+        @return: dict mapping every group to a dict mapping every column in <aggregations>
+                 to a dict mapping each statistic to its value
+        """
+        return aggregate_rows(self.iter_rows(), by, aggregations, by_modifier)
+
+
+AGGREGATES = ('count', 'sum', 'mean', 'min', 'max', 'variance', 'first')
+
+
+class Accumulator:
+    """
+    Streaming statistics of the values of a column in one group. Only the
+    statistics which are asked for are kept up to date.
+
+    Instance Attributes:
+    - count: the number of values added
+    - total: the sum of the values added
+    - mean: the running mean of the values added, used for the variance
+    - m2: the sum of squared differences from the mean, used for the variance
+    - minimum: the smallest value added
+    - maximum: the largest value added
+    - first: the first value added
+
+    Private Instance Attributes:
+    - _stats: the statistics asked for
+    - _sum: if the sum of the values has to be kept
+    - _variance: if the mean and m2 have to be kept
+    - _extremes: if the minimum and maximum have to be kept
+
+    Representation Invariants:
+    - all(stat in AGGREGATES for stat in self._stats)
+    """
+    count: int
+    total: float
+    mean: float
+    m2: float
+    minimum: Any
+    maximum: Any
+    first: Any
+    _stats: tuple
+    _sum: bool
+    _variance: bool
+    _extremes: bool
+
+    def __init__(self, stats: tuple) -> None:
+        """Initialize an empty accumulator for the statistics in <stats>"""
+        for stat in stats:
+            if stat not in AGGREGATES:
+                raise ValueError(f'unknown statistic {stat}, expected one of {AGGREGATES}')
+
+        self._stats = stats
+        self._sum = any(stat in ('sum', 'mean') for stat in stats)
+        self._variance = 'variance' in stats
+        self._extremes = 'min' in stats or 'max' in stats
+
+        self.count = 0
+        self.total = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.first = None
+
+    def add(self, value: Any) -> None:
+        """Add <value> to the statistics"""
+        if self.count == 0:
+            self.first = value
+            self.minimum = value
+            self.maximum = value
+        elif self._extremes:
+            if value < self.minimum:
+                self.minimum = value
+            if value > self.maximum:
+                self.maximum = value
+
+        self.count += 1
+
+        if self._sum:
+            self.total += value
+
+        if self._variance:
+            # Welford's algorithm
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+
+    def result(self) -> Dict[str, Any]:
+        """Return a dict mapping every statistic asked for to its value"""
+        values = {'count': self.count,
+                  'sum': self.total,
+                  'mean': self.total / self.count if self._sum else None,
+                  'min': self.minimum,
+                  'max': self.maximum,
+                  'variance': self.m2 / self.count if self._variance else None,
+                  'first': self.first}
+
+        return {stat: values[stat] for stat in self._stats}
+
+
+def aggregate_rows(rows: Iterable[list],
+                   by: Any,
+                   aggregations: Dict[int, tuple],
+                   by_modifier: Optional = None) -> Dict[Any, Dict[int, Dict[str, Any]]]:
+    """Group <rows> by the column <by> and calculate the statistics in <aggregations>
+    for every group, in one pass over the rows using one Accumulator for every column
+    of every group. The groups are in the order in which they first appear.
+
+    @param rows: the rows of the dataset
+    @param by: the column to group by, or a list of columns to group by all of them
+    @param aggregations: dict mapping a column to the tuple of statistics we want for it
+    @param by_modifier: function to group by modified value of the grouping column
+    @return: dict mapping every group to a dict mapping every column in <aggregations>
+             to a dict mapping each statistic to its value
+    """
+    columns = list(aggregations)
+    groups = {}  # ACCUMULATOR: stores the accumulators for every group
+
+    for row in rows:
+        if isinstance(by, int):
+            key = row[by]
+        else:
+            key = tuple(row[column] for column in by)
+
+        if by_modifier:
+            key = by_modifier(key)
+
+        accumulators = groups.get(key)
+
+        if accumulators is None:
+            accumulators = [Accumulator(aggregations[column]) for column in columns]
+            groups[key] = accumulators
+
+        for column, accumulator in zip(columns, accumulators):
+            accumulator.add(row[column])
+
+    return {key: {column: accumulator.result() for column, accumulator in zip(columns, accumulators)}
+            for key, accumulators in groups.items()}
 
 
 def group_by_values(dataset: Dataset, column: int, filter_values: Optional = None) -> Dict[str, Dataset]:
@@ -193,6 +1230,9 @@ def group_by_values(dataset: Dataset, column: int, filter_values: Optional = Non
     @param filter_values: set of values for column we want to keep
     @return: dict containing datasets with different values for the column
     """
+    if isinstance(dataset, ColumnarDataset):
+        return dataset.split_by_values(column, filter_values)
+
     values_to_keep = dataset.unique(column)
 
     if filter_values:
@@ -282,35 +1322,688 @@ def convert_datatype_for_row(values: list,
     - len(values) == len(types)
     """
 
-    list_so_far = []  # ACCUMULATOR: stores the new values
+    return compile_row_converter(tuple(types), only_year, day_only)(values)
+
+
+def read_rows(file: Any,
+              usecols: Optional[List[int]] = None,
+              where: Optional[Any] = None) -> Iterator[list]:
+    """Yield the rows of the csv file <file>, skipping the header row.
+
+    The filter <where> is applied to every row while the file is read, before
+    anything else is done with it, so rows which are not wanted are never kept.
+    It is either a predicate function taking the row of strings from the file, or
+    a dict mapping a column of the file to the list of values (as strings) the row
+    can have in that column. Only the columns <usecols> of the rows are kept.
+
+    @param file: the open csv file
+    @param usecols: the columns of the file we want to keep, all of them if None
+    @param where: predicate function or dict mapping columns to their allowed values
+    @return: iterator over the rows which are kept
+    """
+    reader = csv.reader(file)
+
+    next(reader)  # skip the header row
+
+    return filter_rows(reader, usecols, where)
+
+
+def filter_rows(rows: Iterable[list],
+                usecols: Optional[List[int]] = None,
+                where: Optional[Any] = None) -> Iterator[list]:
+    """Yield the rows in <rows> which satisfy <where>, with only the columns <usecols>.
+    See read_rows for the meaning of the arguments."""
+    if isinstance(where, dict):
+        where = row_predicate(where)
+
+    if where:
+        rows = filter(where, rows)
+
+    if usecols is None:
+        return iter(rows)
+
+    return ([row[column] for column in usecols] for row in rows)
+
+
+def load_parallel(filepath: str,
+                  workers: int,
+                  usecols: Optional[List[int]] = None,
+                  where: Optional[Any] = None,
+                  types: Optional[list] = None,
+                  year_only: Optional[bool] = False,
+                  day_only: Optional[bool] = False,
+                  columnar: Optional[bool] = False) -> list:
+    """Read the csv file <filepath> with <workers> processes. The file is split
+    into byte ranges ending at the end of a row, and every range is read, filtered
+    and converted to <types> in its own process. The results of the ranges are
+    returned in the same order as they are in the file.
+
+    @param filepath: path of the dataset
+    @param workers: number of processes to use
+    @param usecols: the columns of the file we want to load, all of them if None
+    @param where: predicate function or dict mapping a column of the file to its allowed
+                  values, used to only load some rows (see read_rows)
+    @param types: data types to which columns of dataset need to be converted
+    @param year_only: if we just want the year from datetime object
+    @param day_only: if we just want the day from datetime object
+    @param columnar: if every range is returned as a list of numpy arrays rather than rows
+    @return: list containing the rows (or columns) of every range of the file
+
+    Preconditions:
+    - where is None, a dict or a function defined at the top level of a module, so it
+      can be sent to other processes
+    """
+    ranges = chunk_ranges(filepath, workers * 4)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_chunk,
+                                 [filepath] * len(ranges),
+                                 [start for start, _ in ranges],
+                                 [end for _, end in ranges],
+                                 [(usecols, where, types, year_only, day_only, columnar)] * len(ranges)))
+
+
+class OffsetLines:
+    """
+    An iterator over the lines of a file opened in binary mode, which gives
+    the lines as strings and keeps track of the position in the file after the
+    last line it gave. When it is read by a csv reader, that position is the end
+    of the last row the reader returned, since the reader does not read ahead.
+
+    Instance Attributes:
+    - offset: position in the file after the last line given
+    """
+    offset: int
+
+    def __init__(self, file: Any) -> None:
+        """Initialize the iterator over the lines of <file>, from its current position"""
+        self._file = file
+        self._encoding = locale.getpreferredencoding(False)
+        self.offset = file.tell()
+
+    def __iter__(self) -> 'OffsetLines':
+        """Return the iterator itself"""
+        return self
+
+    def __next__(self) -> str:
+        """Return the next line of the file as a string"""
+        line = self._file.readline()
+
+        if not line:
+            raise StopIteration
+
+        self.offset += len(line)
+        return line.decode(self._encoding)
+
+
+def chunk_ranges(filepath: str, chunks: int) -> List[tuple]:
+    """Return about <chunks> (start, end) byte ranges which together cover all the rows
+    of the file <filepath> after the header row, and which all end at the end of a row.
+
+    A line break only ends a row if it is not inside a quoted value, which is when
+    an even number of quote characters come before it (an escaped quote is written
+    as two quotes), so the quotes are counted while moving through the file.
+
+    @param filepath: path of the file
+    @param chunks: number of ranges we want
+    @return: list of (start, end) tuples
+    """
+    size = os.path.getsize(filepath)
+
+    with open(filepath, 'rb') as file:
+        file.readline()  # skip the header row
+        start = file.tell()
+        step = max((size - start) // chunks, 1)
+        ranges = []
+
+        while start < size:
+            quotes = file.read(step).count(b'"')
+            line = file.readline()  # move to the end of the line
+            quotes += line.count(b'"')
+
+            while quotes % 2 == 1 and line:  # the line break is inside a quoted value
+                line = file.readline()
+                quotes += line.count(b'"')
+
+            end = min(file.tell(), size)
+            ranges.append((start, end))
+            start = end
+
+    return ranges
+
+
+def parse_chunk(filepath: str, start: int, end: int, options: tuple) -> list:
+    """Read the lines between the bytes <start> and <end> of the csv file <filepath>,
+    and return them filtered and converted as asked by <options>. This runs in a
+    worker process of load_parallel.
+
+    @param filepath: path of the dataset
+    @param start: byte at which the first line starts
+    @param end: byte after the end of the last line
+    @param options: tuple of usecols, where, types, year_only, day_only and columnar,
+                    as passed to load_parallel
+    @return: the converted rows, or columns if columnar is True
+    """
+    usecols, where, types, year_only, day_only, columnar = options
+
+    with open(filepath, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode(locale.getpreferredencoding(False))
+
+    rows = filter_rows(csv.reader(io.StringIO(text, newline='')), usecols, where)
+
+    if columnar:
+        columns = columns_from_rows(rows)
+
+        if types:
+            columns = [convert_datatype_for_column(column, datatype, year_only, day_only)
+                       for column, datatype in zip(columns, types)]
+
+        return columns
+
+    if types:
+        return list(map(compile_row_converter(tuple(types), year_only, day_only), rows))
+
+    return list(rows)
+
+
+def row_predicate(allowed_values: Dict[int, Any]) -> Callable[[list], bool]:
+    """Return a predicate which is True for rows having, for every column in
+    <allowed_values>, one of the values it is mapped to"""
+    lookups = [(column, as_lookup(values)) for column, values in allowed_values.items()]
+
+    def predicate(row: list) -> bool:
+        """Return if the row has an allowed value in every column"""
+        return all(row[column] in values for column, values in lookups)
+
+    return predicate
 
-    for index in range(len(values)):
-        if types[index] != datetime and types[index] != list:
-            list_so_far.append(types[index](values[index]))
 
-        elif types[index] == datetime:
-            if only_year:
-                list_so_far.append(convert_to_datetime(values[index]).year)
-            elif day_only:
-                list_so_far.append(convert_to_datetime(values[index]).day)
-            else:
-                list_so_far.append(convert_to_datetime(values[index]))
-        elif types[index] == list:
-            list_so_far.append(ast.literal_eval((values[index])))
+def build_index(kind: str, values: list) -> tuple:
+    """Return an index of kind <kind> of <values>, the values of a column of a dataset.
 
-    return list_so_far
+    A 'hash' index is a tuple (codes, order, starts), where codes maps every value to
+    a number, order has the rows grouped by the number of their value, and the rows
+    whose value has the number i are order[starts[i]:starts[i + 1]]. A 'sorted' index
+    is a tuple (keys, order), where keys are the values in order and order[i] is the
+    row of keys[i]. The rows are kept in numpy arrays, so they can be moved quickly to
+    their new positions when the dataset is filtered (see remap_index).
+
+    @param kind: 'hash' or 'sorted'
+    @param values: the values of the column, one for every row
+    @return: the index
+    """
+    if kind == 'hash':
+        codes = {}
+        numbers = np.fromiter((codes.setdefault(value, len(codes)) for value in values),
+                              dtype=np.int64, count=len(values))
+        order = np.argsort(numbers, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(np.bincount(numbers, minlength=len(codes)))))
+
+        return codes, order, starts
+
+    keys = column_to_array(values)
+    order = np.argsort(keys, kind='stable')
+
+    return keys[order], order
+
+
+def remap_index(kind: str, index: tuple, rows: Any) -> Optional[tuple]:
+    """Return the index <index> of kind <kind> (see build_index) after the dataset is
+    changed to only have the rows at the positions <rows>, in that order, or None if a
+    row is kept more than once (the index is then built again when needed).
+
+    @param kind: 'hash' or 'sorted'
+    @param index: the index before the rows changed
+    @param rows: the old position of every row kept
+    @return: the index of the rows kept
+    """
+    order = index[1]
+    new_positions = np.full(len(order), -1, dtype=np.int64)
+    new_positions[rows] = np.arange(len(rows))
+
+    if np.count_nonzero(new_positions >= 0) != len(rows):
+        return None
+
+    moved = new_positions[order]
+    kept = moved >= 0
+
+    if kind == 'hash':
+        codes, _, starts = index
+        numbers = np.repeat(np.arange(len(starts) - 1), np.diff(starts))
+        counts = np.bincount(numbers[kept], minlength=len(starts) - 1)
+
+        return codes, moved[kept], np.concatenate(([0], np.cumsum(counts)))
+
+    return index[0][kept], moved[kept]
+
+
+def sorted_index_rows(keys: np.ndarray, order: np.ndarray, value: Any) -> np.ndarray:
+    """Return the rows having the value <value> in the 'sorted' index (keys, order)
+    (see build_index). A value which can not be compared with the values of the column,
+    or which numpy only matches after converting it (like '1' in a column of ints), is
+    in no row, like when the rows are checked one by one.
+
+    >>> keys, order = build_index('sorted', ['b', 'a', 'b'])
+    >>> sorted_index_rows(keys, order, 'b').tolist(), sorted_index_rows(keys, order, 1).tolist()
+    ([0, 2], [])
+    """
+    try:
+        start, end = np.searchsorted(keys, value, 'left'), np.searchsorted(keys, value, 'right')
+    except TypeError:
+        return order[:0]
+
+    if start == end or not keys[start] == value:
+        return order[:0]
+
+    return order[start:end]
+
+
+def execute_plan(rows: Iterable[list], plan: list) -> Iterator[list]:
+    """Run the steps of <plan>, as recorded by LazyDataset, on every row in <rows>
+    and yield the rows which are kept.
+
+    The rows may be changed in place, so copies should be passed if they are used
+    somewhere else.
+
+    @param rows: the rows of the dataset
+    @param plan: list of (step, arguments) tuples
+    @return: iterator over the rows after running the plan
+    """
+    run = None
+
+    for row in rows:
+        if run is None:
+            run = compile_plan(plan, len(row))
+
+        row = run(row)
+
+        if row is not None:
+            yield row
+
+
+def compile_plan(plan: list, width: int) -> Callable[[list], Optional[list]]:
+    """Return a function which runs all the steps of <plan> on a single row with
+    <width> columns, and returns the new row or None if the row is filtered out.
+
+    Selecting and deleting columns only changes which column of the original row is
+    read, and type conversions are delayed until the end, so that filters are done
+    before converting the columns they do not look at.
+
+    @param plan: list of (step, arguments) tuples
+    @param width: number of columns of the rows
+    @return: function running the plan on one row
+    """
+    columns = list(range(width))  # column of the current row for every column
+    converters = [None] * width  # conversions which are not done yet
+    stages = []
+
+    def flush() -> None:
+        """Add a stage building the row with all the columns selected and converted"""
+        nonlocal columns, converters, width
+
+        if any(converters) or columns != list(range(width)):
+            stages.append(projection_stage(columns, converters))
+            width = len(columns)
+            columns, converters = list(range(width)), [None] * width
+
+    for step, args in plan:
+        if step == 'select':
+            columns = [columns[column] for column in args[0]]
+            converters = [converters[column] for column in args[0]]
+
+        elif step == 'delete':
+            to_delete = set(args[0])
+            columns = [columns[column] for column in range(len(columns)) if column not in to_delete]
+            converters = [converters[column] for column in range(len(converters)) if column not in to_delete]
+
+        elif step == 'transform':
+            types, year_only, day_only = args
+            converters = [compose_converters(converter, cell_converter(datatype, year_only, day_only))
+                          for converter, datatype in zip(converters, types)] + converters[len(types):]
+
+        elif step in ('filter_by_value', 'filter_range') and converters[args[0]] is not None \
+                and columns.count(columns[args[0]]) == 1:
+            # only convert the column needed by the filter, and keep the converted value
+            stages.append(converting_filter_stage(columns[args[0]], converters[args[0]], value_test(step, args)))
+            converters[args[0]] = None
+
+        elif step in ('filter_by_value', 'filter_range'):
+            if converters[args[0]] is not None:
+                flush()
+
+            stages.append(filter_stage(columns[args[0]], value_test(step, args)))
+
+        elif step == 'remove_na' and not any(converters):
+            # the values are not converted yet, so they can be checked where they are
+            stages.append(na_stage(columns))
+
+        else:  # filter_by_function and remove_na after a conversion need the whole row
+            flush()
+            stages.append(function_stage(has_na if step == 'remove_na' else args[0]))
+
+    flush()
+
+    def run(row: list) -> Optional[list]:
+        """Run all the stages on <row>"""
+        for stage in stages:
+            row = stage(row)
+
+            if row is None:
+                return None
+
+        return row
+
+    return run
+
+
+def projection_stage(columns: List[int], converters: list) -> Callable[[list], list]:
+    """Return a stage which builds the row with the columns <columns> of the
+    original row, converted with their converter in <converters>"""
+    pairs = list(zip(columns, converters))
+
+    def stage(row: list) -> list:
+        """Build the new row"""
+        return [row[column] if converter is None else converter(row[column])
+                for column, converter in pairs]
+
+    return stage
+
+
+def value_test(step: str, args: tuple) -> Callable[[Any], bool]:
+    """Return the function testing a single value for the filter step <step> of a plan"""
+    if step == 'filter_range':
+        _, low, high = args
+        return lambda value: low <= value <= high
+
+    return as_lookup(args[1]).__contains__
+
+
+def filter_stage(column: int, test: Any) -> Callable[[list], Optional[list]]:
+    """Return a stage which drops the rows in which the value of column <column>
+    does not pass <test>"""
+    def stage(row: list) -> Optional[list]:
+        """Return the row if it is kept, and None otherwise"""
+        return row if test(row[column]) else None
+
+    return stage
+
+
+def converting_filter_stage(column: int, converter: Any, test: Any) -> Callable[[list], Optional[list]]:
+    """Return a stage which converts column <column> of the row with <converter>, and
+    drops the row if the converted value does not pass <test>"""
+    def stage(row: list) -> Optional[list]:
+        """Return the row with the converted value if it is kept, and None otherwise"""
+        value = converter(row[column])
+
+        if not test(value):
+            return None
+
+        row[column] = value
+        return row
+
+    return stage
+
+
+def na_stage(columns: List[int]) -> Callable[[list], Optional[list]]:
+    """Return a stage which drops the rows with a None value or empty string in
+    any of the columns <columns>"""
+    def stage(row: list) -> Optional[list]:
+        """Return the row if it is kept, and None otherwise"""
+        for column in columns:
+            if row[column] is None or row[column] == '':
+                return None
+
+        return row
+
+    return stage
+
+
+def function_stage(filter_function: Any) -> Callable[[list], Optional[list]]:
+    """Return a stage which drops the rows not satisfying <filter_function>"""
+    def stage(row: list) -> Optional[list]:
+        """Return the row if it is kept, and None otherwise"""
+        return row if filter_function(row) else None
+
+    return stage
+
+
+def as_lookup(values: Any) -> Any:
+    """Return <values> as a set if all of them are hashable, so membership checks
+    are done in constant time, and as it is otherwise"""
+    try:
+        return set(values)
+    except TypeError:
+        return values
+
+
+def compose_converters(first: Any, second: Any) -> Any:
+    """Return a converter which applies <first> (if it is not None) and then <second>"""
+    if first is None:
+        return second
+
+    return lambda value: second(first(value))
+
+
+def cell_converter(datatype: Any,
+                   year_only: Optional[bool] = False,
+                   day_only: Optional[bool] = False) -> Callable[[Any], Any]:
+    """Return a function converting a single value to <datatype>, the same way
+    convert_datatype_for_row does.
+
+    @param datatype: the type to which we want to convert
+    @param year_only: if we just want the year from datetime object
+    @param day_only: if we just want the day from datetime object
+    """
+    if datatype == datetime and year_only:
+        return iso_year
+    elif datatype == datetime and day_only:
+        return iso_day
+    elif datatype == datetime:
+        return convert_to_datetime
+    elif datatype == list:
+        return ast.literal_eval
+    else:
+        return datatype
+
+
+@lru_cache(maxsize=64)
+def compile_row_converter(types: tuple,
+                          year_only: Optional[bool] = False,
+                          day_only: Optional[bool] = False,
+                          columns: Optional[tuple] = None) -> Callable[[list], list]:
+    """Return a function converting a row to the data types in <types>, the same
+    way convert_datatype_for_row does.
+
+    The converter of every column is found once for the schema, so no type is
+    compared while converting the rows. Compiled converters are cached for every
+    schema.
+
+    @param types: tuple of datatype objects
+    @param year_only: if we just want the year from datetime object
+    @param day_only: if we just want the day from datetime object
+    @param columns: position in the row of every column to convert, if they are not
+                    the columns of the row in order
+    @return: function taking a row and returning the converted row
+
+    >>> convert = compile_row_converter((str, int, datetime), year_only=True)
+    >>> convert(['Canada', '12', '1990-05-01'])
+    ['Canada', 12, 1990]
+    """
+    converters = [cell_converter(datatype, year_only, day_only) for datatype in types]
+
+    if columns is not None:
+        pairs = list(zip(converters, columns))
+
+        def convert_columns(row: list) -> list:
+            """Return the columns <columns> of <row> converted to their data types"""
+            return [converter(row[column]) for converter, column in pairs]
+
+        return convert_columns
+
+    def convert_row(row: list) -> list:
+        """Return <row> converted to the data types
+
+        Preconditions:
+        - len(row) <= len(types)
+        """
+        if len(row) > len(converters):
+            raise IndexError(f'the row has {len(row)} values but only {len(converters)} types are given')
+
+        return [converter(value) for converter, value in zip(converters, row)]
+
+    return convert_row
+
+
+def iso_year(dt: str) -> int:
+    """Return the year of the date <dt>. Dates in the usual YYYY-MM-DD format are
+    read straight from the string, without creating a datetime object.
+
+    Preconditions:
+    - dt is in valid datetime format
+    """
+    if len(dt) >= 10 and dt[4] == '-':
+        return int(dt[:4])
+
+    return convert_to_datetime(dt).year
+
+
+def iso_day(dt: str) -> int:
+    """Return the day of the date <dt>. Dates in the usual YYYY-MM-DD format are
+    read straight from the string, without creating a datetime object.
+
+    Preconditions:
+    - dt is in valid datetime format
+    """
+    if len(dt) >= 10 and dt[4] == '-':
+        return int(dt[8:10])
+
+    return convert_to_datetime(dt).day
+
+
+def columns_from_rows(rows: Any, width: int = 0) -> List[np.ndarray]:
+    """Return one numpy array for every column of <rows>, an iterable of rows
+    of strings or already converted values. If there are no rows, <width> empty
+    columns are returned.
+
+    @param rows: the rows of the dataset
+    @param width: the number of columns of the rows
+    @return: list of numpy arrays, one for each column
+
+    >>> [len(column) for column in columns_from_rows([], 3)]
+    [0, 0, 0]
+    """
+    columns = [column_to_array(list(column)) for column in zip(*rows)]
+
+    return columns or [column_to_array([]) for _ in range(width)]
+
+
+def header_width(filepath: str, usecols: Optional[List[int]] = None) -> int:
+    """Return the number of columns of the csv file <filepath> which are loaded
+    when only the columns <usecols> are kept (all of them if None)"""
+    if usecols is not None:
+        return len(usecols)
+
+    with open(filepath) as file:
+        return len(next(csv.reader(file), []))
+
+
+def column_to_array(values: list) -> np.ndarray:
+    """Return the values of a single column as a typed numpy array. Values which
+    numpy can not store in a typed array (like lists) are stored in an object array.
+
+    Strings are stored in an object array too, since a numpy string array gives every
+    value the size of the longest one, which is many times the size of the strings
+    for columns of free text like tweets. An empty column is an object array too,
+    since the type of its values is not known.
+
+    @param values: the values in the column
+    @return: numpy array with the values of the column
+    """
+    if values and isinstance(values[0], datetime):
+        return np.array(values, dtype='datetime64[us]')
+    elif not values or isinstance(values[0], (str, list, dict)):
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+    else:
+        return np.array(values)
+
+
+def convert_datatype_for_column(column: np.ndarray,
+                                datatype: Any,
+                                year_only: Optional[bool] = False,
+                                day_only: Optional[bool] = False) -> np.ndarray:
+    """
+    Return the numpy array <column> converted into a typed array for the datatype
+    <datatype>. Numeric types are converted by numpy without creating python objects,
+    the other types are converted one value at a time like convert_datatype_for_row.
+
+    @param column: array of values of one column of the dataset
+    @param datatype: the type to which we want to convert the column
+    @param year_only: if we just want the year from datetime object
+    @param day_only: if we just want the day from datetime object
+    @return: the converted column
+    """
+    if datatype == int:
+        return column.astype(np.int64)
+    elif datatype == float:
+        return column.astype(np.float64)
+    elif datatype == str:
+        return column_to_array([str(value) for value in column.tolist()])
+    elif datatype == datetime and (year_only or day_only) and is_iso_date_column(column):
+        # read the year or day straight from the characters of the strings
+        characters = column.astype('U10').view('U1').reshape(len(column), 10)
+        digits = characters[:, 8:10] if day_only else characters[:, :4]
+        return digits.astype(np.int64) @ 10 ** np.arange(digits.shape[1] - 1, -1, -1)
+    elif datatype == datetime and column.dtype.kind == 'M':
+        dates = column.tolist()
+    elif datatype == datetime:
+        dates = [convert_to_datetime(value) for value in column.tolist()]
+    else:
+        convert = cell_converter(datatype)
+        return column_to_array([convert(value) for value in column.tolist()])
+
+    if year_only:
+        return np.array([date.year for date in dates], dtype=np.int64)
+    elif day_only:
+        return np.array([date.day for date in dates], dtype=np.int64)
+    else:
+        return np.array(dates, dtype='datetime64[us]')
+
+
+def is_iso_date_column(column: np.ndarray) -> bool:
+    """Return if every value of the string array <column> starts with a date in
+    the YYYY-MM-DD format"""
+    if column.dtype.kind not in 'UO' or len(column) == 0:
+        return False
+
+    if column.dtype == object and not all(isinstance(value, str) for value in column.tolist()):
+        return False
+
+    characters = column.astype('U10').view('U1').reshape(len(column), 10)
+    digits = np.delete(characters, [4, 7], axis=1)
+
+    return bool(np.all(characters[:, [4, 7]] == '-') and np.all(np.char.isdigit(digits)))
 
 
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'extra-imports': ['pprint',
+        'extra-imports': ['concurrent.futures',
+                          'functools',
+                          'itertools',
+                          'io',
+                          'locale',
+                          'os',
+                          'pprint',
                           'datetime',
+                          'numpy',
                           'csv',
                           'ast',
                           'typing'],
-        'allowed-io': ['load_data'],
+        'allowed-io': ['load_data', 'iter_rows', 'chunk_ranges', 'parse_chunk', 'header_width'],
         'max-line-length': 150,
         'disable': ['R1705', 'C0200']
     })
@@ -0,0 +1,209 @@
+"""
+This file keeps an on-disk cache of parsed and typed datasets, so that
+loading a csv file a second time does not have to parse it and convert
+every value again.
+
+Every column of the typed dataset is saved as its own .npy file, and columns
+which numpy can store without python objects are memory-mapped when the cache
+is loaded. Columns of strings are saved as their text, one after the other in
+a .txt file, with the position where every string ends in a .npy file, so they
+take about as much space as in the csv file.
+
+A cache entry belongs to the source file's path, modification time and size and
+to the types it was converted to, so it is not used any more (and is removed)
+once the csv file changes. The file can be loaded with different types, and the
+entries for every type are kept as long as the file does not change.
+
+References:
+- https://numpy.org/doc/stable/reference/generated/numpy.load.html
+"""
+
+from datetime import datetime
+from typing import Any, List, Optional
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from data_manager import ColumnarDataset, column_to_array
+
+# change this when the layout of the cache changes, so old entries are not used
+CACHE_VERSION = 2
+
+
+def load_dataset(filepath: str,
+                 types: Optional[list] = None,
+                 year_only: Optional[bool] = False,
+                 day_only: Optional[bool] = False,
+                 cache_dir: Optional[str] = None) -> ColumnarDataset:
+    """Return the dataset at <filepath> converted to <types>, from the cache if
+    it has already been parsed and from the csv file otherwise (in which case the
+    parsed dataset is added to the cache).
+
+    @param filepath: path of the dataset
+    @param types: data types to which columns of dataset need to be converted
+    @param year_only: if we just want the year from datetime object
+    @param day_only: if we just want the day from datetime object
+    @param cache_dir: directory of the cache, by default .cache next to the dataset
+    @return: the typed dataset
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(filepath)), '.cache')
+
+    entry = os.path.join(cache_dir, cache_key(filepath, types, year_only, day_only))
+
+    if os.path.exists(os.path.join(entry, 'manifest.json')):
+        return ColumnarDataset(columns=read_columns(entry))
+
+    dataset = ColumnarDataset(filepath=filepath)
+
+    if types:
+        dataset.transform(types, year_only, day_only)
+
+    write_columns(entry, dataset.get_columns())
+
+    return dataset
+
+
+def cache_key(filepath: str,
+              types: Optional[list] = None,
+              year_only: Optional[bool] = False,
+              day_only: Optional[bool] = False) -> str:
+    """Return the name of the cache entry for the dataset at <filepath> converted
+    to <types>. The name is made of a part which only depends on the path, a part
+    which depends on the version of the file (its modification time and size) and
+    a part which depends on the types, so the entries of older versions of the same
+    file can be found and removed without removing the entries for other types.
+
+    @param filepath: path of the dataset
+    @param types: data types to which columns of dataset need to be converted
+    @param year_only: if we just want the year from datetime object
+    @param day_only: if we just want the day from datetime object
+    @return: name of the cache entry
+    """
+    path = os.path.abspath(filepath)
+    stat = os.stat(path)
+
+    version = {'version': CACHE_VERSION,
+               'mtime': stat.st_mtime_ns,
+               'size': stat.st_size}
+    schema = {'types': [type_name(datatype) for datatype in types or []],
+              'year_only': bool(year_only),
+              'day_only': bool(day_only)}
+
+    parts = (path, json.dumps(version, sort_keys=True), json.dumps(schema, sort_keys=True))
+
+    return '-'.join(hashlib.sha1(part.encode()).hexdigest()[:16] for part in parts)
+
+
+def type_name(datatype: Any) -> str:
+    """Return a name identifying <datatype> in a cache key"""
+    if datatype == datetime:
+        return 'datetime'
+
+    return f'{getattr(datatype, "__module__", "")}.{getattr(datatype, "__qualname__", repr(datatype))}'
+
+
+def read_columns(entry: str) -> List[np.ndarray]:
+    """Return the columns saved in the cache entry <entry>. Columns which do not
+    contain python objects are memory-mapped instead of read into memory.
+
+    @param entry: directory of the cache entry
+    @return: list of columns of the dataset
+    """
+    with open(os.path.join(entry, 'manifest.json')) as file:
+        manifest = json.load(file)
+
+    columns = []
+
+    for index, kind in enumerate(manifest['kinds']):
+        path = os.path.join(entry, f'column_{index}')
+
+        if kind == 'text':
+            with open(path + '.txt', encoding='utf-8', newline='') as file:
+                text = file.read()
+
+            ends = np.load(path + '.npy').tolist()
+            columns.append(column_to_array([text[start:end] for start, end in zip([0] + ends, ends)]))
+        elif kind == 'object':
+            columns.append(np.load(path + '.npy', allow_pickle=True))
+        else:
+            columns.append(np.load(path + '.npy', mmap_mode='r'))
+
+    return columns
+
+
+def write_columns(entry: str, columns: List[np.ndarray]) -> None:
+    """Save <columns> as the cache entry <entry>, and remove the entries for older
+    versions of the same source file (see cache_key). The entry is written to a
+    temporary directory first, so a cache entry which is only half written is never
+    read.
+
+    @param entry: directory of the cache entry
+    @param columns: the columns of the dataset
+    """
+    cache_dir, name = os.path.split(entry)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    source, version = name.split('-')[:2]
+
+    for old_entry in os.listdir(cache_dir):
+        if old_entry.startswith(source + '-') and not old_entry.startswith(f'{source}-{version}-'):
+            shutil.rmtree(os.path.join(cache_dir, old_entry), ignore_errors=True)
+
+    temp_dir = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    kinds = [column_kind(column) for column in columns]
+
+    for index, (column, kind) in enumerate(zip(columns, kinds)):
+        path = os.path.join(temp_dir, f'column_{index}')
+
+        if kind == 'text':
+            values = column.tolist()
+
+            with open(path + '.txt', 'w', encoding='utf-8', newline='') as file:
+                file.write(''.join(values))
+
+            np.save(path + '.npy', np.cumsum([len(value) for value in values], dtype=np.int64))
+        else:
+            np.save(path + '.npy', column, allow_pickle=kind == 'object')
+
+    with open(os.path.join(temp_dir, 'manifest.json'), 'w') as file:
+        json.dump({'kinds': kinds}, file)
+
+    try:
+        os.rename(temp_dir, entry)
+    except OSError:  # another process has already written the same entry
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def column_kind(column: np.ndarray) -> str:
+    """Return how <column> is saved in the cache: 'text' for columns of strings,
+    'object' for other columns of python objects and 'array' for typed arrays"""
+    if column.dtype != object:
+        return 'array'
+    elif all(isinstance(value, str) for value in column.tolist()):
+        return 'text'
+    else:
+        return 'object'
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['datetime',
+                          'typing',
+                          'hashlib',
+                          'json',
+                          'os',
+                          'shutil',
+                          'tempfile',
+                          'numpy',
+                          'data_manager'],
+        'allowed-io': ['read_columns', 'write_columns'],
+        'max-line-length': 150,
+        'disable': ['R1705', 'C0200']
+    })
@@ -8,10 +8,12 @@ from linear_regression import train, predict_values, plot_statistics
 from global_land_temp import get_avg_by_year
 
 
-def train_emissions(emissions_path: str) -> Any:
+def train_emissions(emissions_path: str, method: str = 'gd') -> Any:
     """The function trains a model for the emissions dataset
 
     @param emissions_path: path to the dataset
+    @param method: 'gd' to train with gradient descent, or 'lstsq' to solve the least squares
+                   problem directly (see linear_regression.train)
     @return: Return the trained model
     """
     tags = [
@@ -36,15 +38,17 @@ def train_emissions(emissions_path: str) -> Any:
     input_y_emissions = np.flip(input_y_emissions)
 
     # train model
-    weights, history = train(input_x_emissions, input_y_emissions, iterations, learning_rate)
+    weights, history = train(input_x_emissions, input_y_emissions, iterations, learning_rate, method)
 
     return input_x_emissions, input_y_emissions, weights, history
 
 
-def train_land_temp(temp_path: str) -> Any:
+def train_land_temp(temp_path: str, method: str = 'gd') -> Any:
     """The function trains a model for the Land temp dataset
 
     @param temp_path: path to the dataset
+    @param method: 'gd' to train with gradient descent, or 'lstsq' to solve the least squares
+                   problem directly (see linear_regression.train)
     @return: trained model
     """
 
@@ -60,21 +64,23 @@ def train_land_temp(temp_path: str) -> Any:
     input_y_land_temp = np.array(get_avg_by_year(temp_path, countries)[0]).reshape(24, 1)
 
     # train model
-    weights1, history1 = train(input_x_land_temp, input_y_land_temp, iterations, learning_rate)
+    weights1, history1 = train(input_x_land_temp, input_y_land_temp, iterations, learning_rate, method)
 
     return input_x_land_temp, input_y_land_temp, weights1, history1
 
 
-def predict_temp_and_emissions(temp_path: str, emissions_path: str) -> None:
+def predict_temp_and_emissions(temp_path: str, emissions_path: str, method: str = 'gd') -> None:
     """Plot a scatter plot predicting the the future values for average land temperature
     and co2 emissions for 2015, 2016, and 2017 given the data we have from 1990 to 2014.
 
     @param temp_path: path for land temperature dataset
     @param emissions_path: path for Co2 emissions dataset
+    @param method: 'gd' to train the models with gradient descent, or 'lstsq' to solve the
+                   least squares problems directly (see linear_regression.train)
     """
 
-    model_emissions = train_emissions(emissions_path)
-    model_land_temp = train_land_temp(temp_path)
+    model_emissions = train_emissions(emissions_path, method)
+    model_land_temp = train_land_temp(temp_path, method)
 
     # plotting fitted line and loss graph
     plot_statistics(model_emissions[0],
@@ -19,7 +19,7 @@ from datetime import datetime
 from typing import List, Dict
 import plotly.graph_objects as go
 import matplotlib.pyplot as plt
-from data_manager import Dataset, group_by_values
+from data_manager import LazyDataset
 
 
 def get_avg_by_year(filepath: str, countries: List[str]) -> List[List[float]]:
@@ -30,8 +30,8 @@ def get_avg_by_year(filepath: str, countries: List[str]) -> List[List[float]]:
     @return: a list containing list for every countries yearly average
     """
 
-    # load the data
-    dataset = Dataset(filepath)
+    # load the data lazily, so all the steps below run in one pass over the file
+    dataset = LazyDataset(filepath)
     # remove the unnecessary columns
     dataset.delete([2, 3])
     # remove the rows with no values
@@ -39,17 +39,16 @@ def get_avg_by_year(filepath: str, countries: List[str]) -> List[List[float]]:
     # convert each column to its respective datatype
     dataset.transform([datetime, float, str], year_only=True)
     # only keep values from year 1990 to 2013
-    dataset.filter_by_value(0, list(range(1990, 2014)))
-    # group the data by country
-    grouped_data = group_by_values(dataset, 2)
+    dataset.filter_range(0, 1990, 2013)
+    # group the data by country and year and calculate the average for every group
+    grouped_data = dataset.aggregate([2, 0], {1: ('mean',)})
 
     averages = []  # ACCUMILATOR: store the list with yearly average of every country
 
     for country in countries:
-        # extract data for <country> country
-        country_data = grouped_data[country]
-        # group the data by year an calculate average for that year
-        averages.append(country_data.calculate_average(0, 1)[1])
+        # extract the yearly averages for <country> country, in order of the years
+        years = sorted(year for group_country, year in grouped_data if group_country == country)
+        averages.append([grouped_data[(country, year)][1]['mean'] for year in years])
 
     return averages
 
@@ -62,8 +61,8 @@ def get_avg_by_country(filepath: str, countries: List[str]) -> Dict[str, float]:
     @param countries: countries for which we want the average
     @return: a dict mapping country to its average land temperature
     """
-    # load the data
-    dataset = Dataset(filepath)
+    # load the data lazily, so all the steps below run in one pass over the file
+    dataset = LazyDataset(filepath)
     # remove the unnecessary columns
     dataset.delete([2, 3])
     # remove the rows with no values
@@ -71,16 +70,14 @@ def get_avg_by_country(filepath: str, countries: List[str]) -> Dict[str, float]:
     # convert each column to its respective datatype
     dataset.transform([datetime, float, str], year_only=True)
     # only keep values from year 1990 to 2013
-    dataset.filter_by_value(0, list(range(1990, 2014)))
-    # group the data by country
-    grouped_data = group_by_values(dataset, 2)
+    dataset.filter_range(0, 1990, 2013)
+    # group the data by country and calculate the average temperature of every country
+    grouped_data = dataset.aggregate(2, {1: ('mean',)})
 
     return_dict = {}  # ACCUMULATOR: store the country and its average
 
     for country in countries:
-        # extracting the data for a country and then calculating the
-        # average of average temperature column in the dataset.
-        return_dict[country] = grouped_data[country].calc_avg_col(1)
+        return_dict[country] = grouped_data[country][1]['mean']
 
     return return_dict
 
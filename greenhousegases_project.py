@@ -15,7 +15,7 @@ import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import plotly.express as px
 
-from data_manager import Dataset, group_by_values
+from data_manager import Dataset, ColumnarDataset
 
 
 def data_by_tags_country_year(filepath: str,
@@ -34,21 +34,19 @@ def data_by_tags_country_year(filepath: str,
     @return: Return a list containing lists for every countries emission value
     """
 
-    # extract dataset and covert all variables into their respective datatype
-    dataset = Dataset(filepath=filepath, types=[str, int, float, str])
+    # extract the rows with tags we want and covert all variables into their respective datatype
+    dataset = ColumnarDataset(filepath=filepath, types=[str, int, float, str], where={3: tags})
 
-    # keeping rows with tags we want
-    dataset.filter_by_value(3, tags)
-
-    # splitting by countries
-    grouped_data = group_by_values(dataset, country_or_year)
+    # indexing the countries or years, so the rows of every one of them are found without a scan
+    dataset.create_index(country_or_year)
+    emissions = dataset.get_columns()[2]
 
     # Extracting emission values for the countries we want to analyze
     countries_so_far = []
 
     for county in countries_or_years:
-        county_data = grouped_data[county]
-        countries_so_far.append(county_data.extract_column(2))
+        rows = dataset.lookup(country_or_year, [county])
+        countries_so_far.append(emissions[rows].tolist())
 
     return countries_so_far
 
@@ -69,19 +67,21 @@ def data_by_tags(filepath: str,
     @param country_filter: list of countries we want data for
     @param year_filter: list of years we want data for
     @return: Return a list with emission value alongside the respective country and year
-    """
 
-    # extract dataset and covert all variables into thir respective datatype
-    dataset = Dataset(filepath=filepath, types=[str, int, float, str])
+    >>> data_by_tags('datasets/greenhouse_gas_inventory_data_data.csv', ['no_such_category'])
+    [[], [], []]
+    """
 
-    # keeping rows with tags we want
-    dataset.filter_by_value(3, tags)
+    # keeping rows with tags, countries and years we want while reading the file
+    where = {3: tags}
 
-    # filtering countries and years
     if country_filter:
-        dataset.filter_by_value(0, country_filter)
+        where[0] = country_filter
     if year_filter:
-        dataset.filter_by_value(1, year_filter)
+        where[1] = [str(year) for year in year_filter]
+
+    # extract dataset and covert all variables into thir respective datatype
+    dataset = ColumnarDataset(filepath=filepath, types=[str, int, float, str], where=where)
 
     # extract the values, countries and years
     values = dataset.extract_column(2)
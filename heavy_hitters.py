@@ -0,0 +1,158 @@
+"""
+This file has a counter which finds the most frequent items of a stream using a
+fixed amount of memory, for streams with too many distinct items (like all the
+words of millions of tweets) to count them all exactly.
+
+The counter uses the Space-Saving algorithm: it keeps the counts of at most
+<capacity> items. When a new item arrives and the counter is full, the item with
+the lowest count is replaced by the new item, which takes over its count (plus
+one). Thus, the count of an item is never lower than its true count, and it is at
+most total / capacity higher, where total is the number of items counted. Every
+item whose true count is higher than total / capacity is always in the counter.
+
+References:
+- Metwally, Agrawal and El Abbadi, Efficient Computation of Frequent and Top-k
+  Elements in Data Streams, 2005
+- https://docs.python.org/3/library/heapq.html
+"""
+
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+import heapq
+import math
+
+
+class SpaceSaving:
+    """
+    A counter for the approximate counts of the most frequent items of a stream,
+    which keeps at most <capacity> items in memory. It can be used like a Counter
+    for counting and reading the counts of the most frequent items.
+
+    Instance Attributes:
+    - capacity: the maximum number of items counted at once
+    - total: the number of items counted so far
+
+    Private Instance Attributes:
+    - _counts: dict mapping every item counted to its approximate count
+    - _errors: dict mapping every item counted to the most by which its count can be
+               higher than its true count
+    - _heap: min-heap of (count, item) with one entry per item counted, where the
+             count may be lower than the current count of the item
+
+    Representation Invariants:
+    - self.capacity > 0
+    - len(self._counts) <= self.capacity
+    - self._counts.keys() == self._errors.keys()
+    - all(0 <= self._errors[item] < self._counts[item] for item in self._counts)
+    """
+    capacity: int
+    total: int
+    _counts: Dict[Hashable, int]
+    _errors: Dict[Hashable, int]
+    _heap: List[Tuple[int, Any]]
+
+    def __init__(self, capacity: int = 10000, items: Optional[Iterable[Hashable]] = None) -> None:
+        """Initialize a counter keeping at most <capacity> items, and count <items>
+
+        Preconditions:
+        - capacity > 0
+        """
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        self._heap = []
+
+        if items is not None:
+            self.update(items)
+
+    @classmethod
+    def with_error(cls, error: float) -> 'SpaceSaving':
+        """Return a counter whose counts are at most <error> * total higher than the
+        true counts
+
+        Preconditions:
+        - 0 < error <= 1
+        """
+        return cls(math.ceil(1 / error))
+
+    def update(self, items: Iterable[Hashable]) -> None:
+        """Count every item of <items>"""
+        counts, errors = self._counts, self._errors
+
+        for item in items:
+            self.total += 1
+
+            if item in counts:
+                # the heap entry of the item is not updated, see _pop_min
+                counts[item] += 1
+            elif len(counts) < self.capacity:
+                counts[item] = 1
+                errors[item] = 0
+                heapq.heappush(self._heap, (1, item))
+            else:
+                count = self._pop_min()
+                counts[item] = count + 1
+                errors[item] = count
+                heapq.heappush(self._heap, (count + 1, item))
+
+    def _pop_min(self) -> int:
+        """Remove the item with the lowest count from the counter and return its count.
+
+        The counts of the heap entries are not updated when an item is counted, so an
+        entry whose count is not the current count of its item is pushed again with the
+        current count, until the entry at the top of the heap is up to date.
+        """
+        count, item = heapq.heappop(self._heap)
+
+        while count != self._counts[item]:
+            count, item = heapq.heappushpop(self._heap, (self._counts[item], item))
+
+        del self._counts[item]
+        del self._errors[item]
+
+        return count
+
+    def __getitem__(self, item: Hashable) -> int:
+        """Return the approximate count of <item>, or 0 if it is not counted"""
+        return self._counts.get(item, 0)
+
+    def __contains__(self, item: Hashable) -> bool:
+        """Return whether <item> is counted"""
+        return item in self._counts
+
+    def __len__(self) -> int:
+        """Return the number of items counted"""
+        return len(self._counts)
+
+    def items(self) -> Iterable[Tuple[Hashable, int]]:
+        """Return the (item, approximate count) pairs of the items counted"""
+        return self._counts.items()
+
+    def error(self, item: Hashable) -> int:
+        """Return the most by which the count of <item> can be higher than its true count"""
+        return self._errors.get(item, 0)
+
+    def error_bound(self) -> float:
+        """Return the most by which any count can be higher than the true count"""
+        return self.total / self.capacity
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """Return the <n> items with the highest counts (all of them if n is None) and
+        their approximate counts, from the highest count"""
+        if n is None:
+            return sorted(self._counts.items(), key=lambda pair: pair[1], reverse=True)
+
+        return heapq.nlargest(n, self._counts.items(), key=lambda pair: pair[1])
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['typing',
+                          'heapq',
+                          'math'],
+        'allowed-io': [],
+        'max-line-length': 150,
+        'disable': ['R1705', 'C0200']
+    })
@@ -44,16 +44,21 @@ def cost(x: np.array, y: np.array, weights: np.array) -> np.array:
     return np.sum(np.square(residual)) / (2 * m)
 
 
-def train(x: np.array, y: np.array, iterations: int, learning_rate: float) -> list:
+def train(x: np.array, y: np.array, iterations: int, learning_rate: float, method: str = 'gd') -> list:
     """The function would calculate the gradients of the randomly initialized weight and bias
     and change them according to the gradient and the learning rate. This process is repeated
     <iterations> times, and return the trained weights. The aim is to reduce the cost of these
     parameters.
 
+    If <method> is 'lstsq', the weights with the lowest cost are instead calculated directly
+    by solving the least squares problem with np.linalg.lstsq, and the cost history only
+    has the cost of these weights. <iterations> and <learning_rate> are then not used.
+
     @param x: array of values of predictor variable of our model
     @param y: array of values of dependent variable corresponding to the values in x
     @param iterations: number of times we want to train the model on our dataset
     @param learning_rate: the learning  rate of the model
+    @param method: 'gd' for gradient descent, or 'lstsq' for the least squares solution
     @return: list containing weights and cost_history
 
     Preconditions:
@@ -61,10 +66,16 @@ def train(x: np.array, y: np.array, iterations: int, learning_rate: float) -> li
     - y.shape = [no. of rows, 1]
     - iterations >= 0
     - learning rate >= 0
+    - method in {'gd', 'lstsq'}
     """
 
     x = np.insert(x, 0, np.array([1]), axis=1)
 
+    if method == 'lstsq':
+        weights = np.linalg.lstsq(x, y, rcond=None)[0].astype(float)
+
+        return [weights, np.array([cost(x, y, weights)])]
+
     m = x.shape[0]  # total samples in the array
 
     weights = np.zeros((x.shape[1], 1))  # initialize weights
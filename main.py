@@ -7,7 +7,7 @@ Refrences:
 - https://www.geeksforgeeks.org/python-grid-method-in-tkinter/
 """
 
-from analyze_data import plot_top_10, plot_sentiments
+from analyze_data import analyze_tweets, draw_sentiments, draw_top_words
 import greenhousegases_project
 import global_land_temp
 import future_predict
@@ -47,8 +47,11 @@ def twitter_visualizations() -> None:
     """
     Twitter_data = 'datasets/climate-change-sentiment.csv'
 
-    plot_sentiments(Twitter_data)
-    plot_top_10(Twitter_data)
+    # all the analyses used by the charts are computed in one pass over the dataset
+    analytics = analyze_tweets(Twitter_data)
+
+    draw_sentiments(*analytics.daily_average)
+    draw_top_words(analytics.top_words(11))
 
 
 def predictions_visualizations() -> None:
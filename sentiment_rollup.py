@@ -0,0 +1,135 @@
+"""
+This file keeps pre-aggregated statistics of the sentiment of the tweets for
+every hour and every day, so charts of the sentiment over time can be made from
+a few hundred rows of statistics instead of reading every tweet.
+
+For every hour and every calendar day, the rollup keeps the number of tweets, the
+sum and the sum of squares of their sentiment scores and the number of tweets with
+every tag (positive, neutral or negative). These are enough for the mean and the
+variance of any group of hours or days.
+
+The rollup of a dataset made by add_sentiments_to_data is saved next to it (see
+sentiment_rollup), and when rows have been added to the end of the dataset since
+then, only the new rows are read, like for the indexes of tweet_index.
+
+References:
+- https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from tweet_index import TAGS, DatasetIndex, cached_index
+
+# the columns of the dataset made by add_sentiments_to_data used by the rollup
+SCORE_COLUMN, TAG_COLUMN, CREATED_AT_COLUMN = 1, 2, 6
+
+# number of characters of created_at (like 2020-11-09 12:53:19) naming every hour and day
+GRANULARITIES = {'hour': 13, 'day': 10}
+
+
+class SentimentRollup(DatasetIndex):
+    """
+    Statistics of the sentiment scores of the tweets of a dataset for every hour and
+    every day. Hours are named like '2020-11-09 12' and days like '2020-11-09'.
+
+    Private Instance Attributes:
+    - _buckets: dict mapping 'hour' and 'day' to a dict mapping every hour (or day) to
+                the list [count, sum, sum of squares, positive, neutral, negative]
+
+    Representation Invariants:
+    - set(self._buckets) == set(GRANULARITIES)
+    - all(len(stats) == 6 for buckets in self._buckets.values() for stats in buckets.values())
+    """
+    _buckets: Dict[str, Dict[str, List[float]]]
+
+    def _clear(self) -> None:
+        """Remove all the tweets from the rollup"""
+        self._buckets = {granularity: {} for granularity in GRANULARITIES}
+
+    def _add_row(self, row: List[str]) -> None:
+        """Add the tweet of <row>, a row of the dataset, to the rollup"""
+        self.add(row[CREATED_AT_COLUMN], float(row[SCORE_COLUMN]), row[TAG_COLUMN])
+
+    def _get_state(self) -> tuple:
+        """Return the statistics of every hour and day"""
+        return (self._buckets,)
+
+    def _set_state(self, state: tuple) -> None:
+        """Set the statistics of every hour and day"""
+        self._buckets = state[0]
+
+    def add(self, created_at: str, score: float, tag: str) -> None:
+        """Add a tweet created at <created_at> (like 2020-11-09 12:53:19) with the
+        sentiment <score> and <tag> to the rollup"""
+        for granularity, length in GRANULARITIES.items():
+            stats = self._buckets[granularity].setdefault(created_at[:length], [0, 0.0, 0.0, 0, 0, 0])
+            stats[0] += 1
+            stats[1] += score
+            stats[2] += score * score
+            stats[3 + TAGS.index(tag)] += 1
+
+    def series(self,
+               granularity: str = 'day',
+               start: Optional[str] = None,
+               end: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """Return the statistics of every hour or day from <start> to <end> (both
+        included, all of them if None), in order of time.
+
+        @param granularity: 'hour' or 'day'
+        @param start: the first hour or day, like '2020-11-09 12' or '2020-11-09'
+        @param end: the last hour or day
+        @return: list of (hour or day, statistics) tuples, see statistics
+        """
+        buckets = self._buckets[granularity]
+
+        return [(bucket, statistics(buckets[bucket])) for bucket in sorted(buckets)
+                if (start is None or bucket >= start) and (end is None or bucket <= end)]
+
+    def summary(self,
+                granularity: str = 'day',
+                start: Optional[str] = None,
+                end: Optional[str] = None) -> Dict[str, Any]:
+        """Return the statistics of all the tweets from the hour or day <start> to <end>
+        (both included, all of them if None), like series"""
+        buckets = self._buckets[granularity]
+        total = [0, 0.0, 0.0, 0, 0, 0]  # ACCUMULATOR: stores the sums of the statistics
+
+        for bucket in buckets:
+            if (start is None or bucket >= start) and (end is None or bucket <= end):
+                total = [value + other for value, other in zip(total, buckets[bucket])]
+
+        return statistics(total)
+
+
+def statistics(stats: List[float]) -> Dict[str, Any]:
+    """Return the count, mean and variance of the scores and the count of every tag
+    from <stats>, a list [count, sum, sum of squares, positive, neutral, negative]"""
+    count, total, squares = stats[0], stats[1], stats[2]
+
+    return {'count': count,
+            'mean': total / count if count else None,
+            'variance': max(squares / count - (total / count) ** 2, 0.0) if count else None,
+            'tags': dict(zip(TAGS, stats[3:]))}
+
+
+def sentiment_rollup(filepath: str, use_cache: bool = True) -> SentimentRollup:
+    """Return the rollup of the dataset made by add_sentiments_to_data at <filepath>.
+    The rollup is saved next to the dataset (see cached_index).
+
+    @param filepath: the path of the dataset
+    @param use_cache: if we want to use and update the saved rollup
+    @return: the rollup
+    """
+    return cached_index(SentimentRollup(filepath), filepath + '.rollup.marshal', use_cache)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['typing',
+                          'tweet_index'],
+        'allowed-io': [],
+        'max-line-length': 150,
+        'disable': ['R1705', 'C0200']
+    })
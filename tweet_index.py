@@ -0,0 +1,485 @@
+"""
+This file reads the hashtags of the tweets quickly and keeps indexes of the
+tweets of a dataset, so questions about hashtags (how often they are used, which
+hashtags are used together) and about the words of the tweets (what is the
+sentiment of the tweets mentioning some words) can be answered without reading
+the whole dataset again.
+
+The hashtags of a tweet are written in the datasets as a list of dicts like
+[{'text': 'ClimateChange', 'indices': [95, 109]}], as returned by the twitter API.
+Instead of evaluating this list with ast.literal_eval, parse_hashtags only finds
+the 'text' values with a regular expression.
+
+The indexes of a dataset are saved next to it (see hashtag_index and text_index),
+and when rows have been added to the end of the dataset since then, only the new
+rows are read.
+
+References:
+- https://docs.python.org/3/library/re.html
+- https://docs.python.org/3/library/marshal.html
+- https://en.wikipedia.org/wiki/Inverted_index
+"""
+
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple, Union
+import csv
+import hashlib
+import marshal
+import os
+import re
+
+import numpy as np
+
+from data_manager import OffsetLines
+
+# matches the value of every 'text' key in the list of hashtags of a tweet
+HASHTAG_PATTERN = re.compile(r"""['"]text['"]:\s*['"]([^'"]*)['"]""")
+
+# the sentiment tags of the tweets, in the order their counts are kept
+TAGS = ('positive', 'neutral', 'negative')
+
+# table for str.translate removing the punctuation before the words of a text are used
+PUNCTUATION = str.maketrans('', '', '.",-_#?@')
+
+# number of bytes at the start of a dataset, and before the end of the last row read,
+# used to recognize it (see DatasetIndex.update)
+BLOCK_SIZE = 4096
+
+# change this when the layout of the saved indexes changes, so old files are not used
+INDEX_VERSION = 3
+
+
+def parse_hashtags(value: str) -> List[str]:
+    """Return the hashtags (in lower-case, without #) in <value>, the list of hashtags
+    of a tweet as written in the datasets. This can be used as the type of the hashtag
+    column when a dataset is loaded.
+
+    >>> parse_hashtags("[{'text': 'ClimateChange', 'indices': [95, 109]}, {'text': 'QandA', 'indices': [158, 164]}]")
+    ['climatechange', 'qanda']
+    """
+    return HASHTAG_PATTERN.findall(value.lower())
+
+
+def tokenize(text: str) -> List[str]:
+    """Return the words of <text> in lower-case and without punctuation, in order,
+    as they are used by word_count and TextIndex
+
+    >>> tokenize('Fight. Fight. #ClimateChange denialism?')
+    ['fight', 'fight', 'climatechange', 'denialism']
+    """
+    return str.split(str.lower(str.translate(text, PUNCTUATION)))
+
+
+class DatasetIndex(ABC):
+    """
+    An index of the rows of a csv dataset which can be brought up to date when rows
+    are added to the end of the dataset, by reading only the new rows (see update),
+    and saved to a file. Rows are numbered from 0, without the header row, like the
+    rows of a Dataset.
+
+    Subclasses say what is kept for every row by implementing _clear, _add_row,
+    _get_state and _set_state.
+
+    Instance Attributes:
+    - filepath: the path of the dataset
+    - offset: the position in the file after the last row read
+    - size: the number of rows read
+    - mtime: the modification time (in ns) of the dataset when it was last read
+    - prefix: hash of the first bytes of the dataset when it was last read
+    - suffix: hash of the bytes before self.offset when the dataset was last read
+    """
+    filepath: str
+    offset: int
+    size: int
+    mtime: int
+    prefix: str
+    suffix: str
+
+    def __init__(self, filepath: str) -> None:
+        """Initialize an empty index for the dataset at <filepath> (see update)"""
+        self.filepath = filepath
+        self.offset = 0
+        self.size = 0
+        self.mtime = 0
+        self.prefix = ''
+        self.suffix = ''
+        self._clear()
+
+    def update(self) -> None:
+        """Add the rows which have been added to the end of the dataset since the
+        last update to the index. If the dataset was changed without growing, if the
+        bytes read last time are not all still there (the first bytes, the bytes before
+        self.offset and the newline ending the last row read), or if a new row can not
+        be read, the whole dataset is read again."""
+        with open(self.filepath, 'rb') as file:
+            stat = os.fstat(file.fileno())
+
+            if self.offset and not self._only_grown(file, stat.st_size, stat.st_mtime_ns):
+                self._reset()
+
+            self.mtime = stat.st_mtime_ns
+
+            only_new_rows = self.offset > 0
+
+            try:
+                self._read_rows(file)
+            except (ValueError, IndexError, KeyError, csv.Error):
+                if not only_new_rows:
+                    raise
+
+                # the new rows do not continue the rows read before
+                self._reset()
+                self._read_rows(file)
+
+            self.prefix, self.suffix = self._hashes(file)
+
+    def _only_grown(self, file: Any, file_size: int, mtime: int) -> bool:
+        """Return whether the dataset opened as <file>, of <file_size> bytes and modified
+        at <mtime>, still has the bytes read last time, with at most new rows after them.
+
+        Only the first bytes and the bytes before self.offset are compared, so a dataset
+        modified without growing (like a tweet scored again in place) is always read
+        again, since no row was added to it."""
+        if self.offset > file_size or (self.offset == file_size and mtime != self.mtime):
+            return False
+
+        file.seek(self.offset - 1)
+
+        if self.offset < file_size and file.read(1) != b'\n':
+            return False
+
+        return self._hashes(file) == (self.prefix, self.suffix)
+
+    def _hashes(self, file: Any) -> Tuple[str, str]:
+        """Return the hashes of the first bytes of the dataset opened as <file> and of
+        the bytes before self.offset"""
+        file.seek(0)
+        prefix = hashlib.sha1(file.read(min(self.offset, BLOCK_SIZE))).hexdigest()
+
+        file.seek(max(self.offset - BLOCK_SIZE, 0))
+        suffix = hashlib.sha1(file.read(min(self.offset, BLOCK_SIZE))).hexdigest()
+
+        return prefix, suffix
+
+    def _reset(self) -> None:
+        """Remove all the rows from the index, so the dataset is read from the start"""
+        self.offset = 0
+        self.size = 0
+        self._clear()
+
+    def _read_rows(self, file: Any) -> None:
+        """Add the rows of the dataset opened as <file> after self.offset to the index"""
+        file.seek(self.offset)
+        lines = OffsetLines(file)
+        reader = csv.reader(lines)
+
+        if self.offset == 0:
+            next(reader, None)  # skip the header row
+            self.offset = lines.offset
+
+        for row in reader:
+            self._add_row(row)
+            self.size += 1
+            self.offset = lines.offset
+
+    def is_current(self) -> bool:
+        """Return whether the dataset has not changed since it was last read"""
+        stat = os.stat(self.filepath)
+
+        return (self.mtime, self.offset) == (stat.st_mtime_ns, stat.st_size)
+
+    def save(self, path: str) -> None:
+        """Save the index at <path>. The file is written under another name first and
+        then renamed, so it is never read half written."""
+        with open(path + '.tmp', 'wb') as file:
+            file.write(marshal.dumps((INDEX_VERSION, type(self).__name__, self.offset, self.size,
+                                      self.mtime, self.prefix, self.suffix, self._get_state())))
+
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path: str, filepath: str) -> Optional['DatasetIndex']:
+        """Return the index saved at <path> for the dataset at <filepath>, or None if
+        there is no saved index of this class. The index may not have the rows added
+        to the dataset after it was saved (see update).
+
+        @param path: the path of the saved index
+        @param filepath: the path of the dataset
+        @return: the index, or None
+        """
+        try:
+            with open(path, 'rb') as file:
+                version, name, offset, size, mtime, prefix, suffix, state = marshal.loads(file.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        if version != INDEX_VERSION or name != cls.__name__:
+            return None
+
+        index = cls(filepath)
+        index.offset, index.size, index.mtime, index.prefix, index.suffix = offset, size, mtime, prefix, suffix
+        index._set_state(state)
+
+        return index
+
+    @abstractmethod
+    def _clear(self) -> None:
+        """Remove all the rows from the index"""
+
+    @abstractmethod
+    def _add_row(self, row: List[str]) -> None:
+        """Add <row>, the row number self.size of the dataset, to the index"""
+
+    @abstractmethod
+    def _get_state(self) -> tuple:
+        """Return what is kept for the rows, as a tuple of values which marshal can save"""
+
+    @abstractmethod
+    def _set_state(self, state: tuple) -> None:
+        """Set what is kept for the rows to <state>, as returned by _get_state"""
+
+
+class HashtagIndex(DatasetIndex):
+    """
+    An inverted index of the hashtags of the tweets of a dataset: for every hashtag,
+    the rows of the tweets which use it.
+
+    Instance Attributes:
+    - column: the column of the hashtags in the dataset
+
+    Private Instance Attributes:
+    - _rows: dict mapping every hashtag to the list of rows using it, in increasing order
+    - _tags: for every row, the hashtags it uses
+
+    Representation Invariants:
+    - len(self._tags) == self.size
+    - all(row < self.size for rows in self._rows.values() for row in rows)
+    """
+    column: int
+    _rows: Dict[str, List[int]]
+    _tags: List[List[str]]
+
+    def __init__(self, filepath: str, column: int = 3) -> None:
+        """Initialize an empty index for the dataset at <filepath>, whose hashtags are
+        in the column <column> (see update)"""
+        self.column = column
+        super().__init__(filepath)
+
+    def _clear(self) -> None:
+        """Remove all the rows from the index"""
+        self._rows = {}
+        self._tags = []
+
+    def _add_row(self, row: List[str]) -> None:
+        """Add the hashtags of <row> to the index"""
+        tags = list(dict.fromkeys(parse_hashtags(row[self.column])))
+
+        for tag in tags:
+            self._rows.setdefault(tag, []).append(self.size)
+
+        self._tags.append(tags)
+
+    def _get_state(self) -> tuple:
+        """Return the column, the rows of every hashtag and the hashtags of every row"""
+        return self.column, self._rows, self._tags
+
+    def _set_state(self, state: tuple) -> None:
+        """Set the column, the rows of every hashtag and the hashtags of every row"""
+        self.column, self._rows, self._tags = state
+
+    def rows(self, hashtag: str) -> List[int]:
+        """Return the rows of the tweets using <hashtag> (in any case, with or without #)"""
+        return self._rows.get(hashtag.lower().lstrip('#'), [])
+
+    def hashtags(self, row: int) -> List[str]:
+        """Return the hashtags used by the tweet at <row>"""
+        return self._tags[row]
+
+    def counts(self) -> Counter:
+        """Return a Counter mapping every hashtag to the number of tweets using it"""
+        return Counter({tag: len(rows) for tag, rows in self._rows.items()})
+
+    def co_occurrences(self, hashtag: str) -> Counter:
+        """Return a Counter mapping every other hashtag to the number of tweets using
+        it together with <hashtag>"""
+        hashtag = hashtag.lower().lstrip('#')
+        counts = Counter()
+
+        for row in self.rows(hashtag):
+            counts.update(tag for tag in self._tags[row] if tag != hashtag)
+
+        return counts
+
+
+class TextIndex(DatasetIndex):
+    """
+    An inverted index of the words of the tweets of a dataset made by
+    add_sentiments_to_data: for every word (see tokenize), the rows of the tweets
+    which contain it. The sentiment score and tag of every tweet are kept too, so
+    the statistics of the sentiment of the tweets found by a query are computed
+    without reading the dataset.
+
+    Private Instance Attributes:
+    - _rows: dict mapping every word to the list of rows containing it, in increasing order
+    - _scores: the sentiment score of every row
+    - _tags: the index in TAGS of the sentiment tag of every row
+    - _arrays: _scores and _tags as numpy arrays, or None if rows were added since
+               they were made
+
+    Representation Invariants:
+    - len(self._scores) == len(self._tags) == self.size
+    - all(row < self.size for rows in self._rows.values() for row in rows)
+    """
+    _rows: Dict[str, List[int]]
+    _scores: List[float]
+    _tags: List[int]
+    _arrays: Optional[Tuple[np.ndarray, np.ndarray]]
+
+    def _clear(self) -> None:
+        """Remove all the rows from the index"""
+        self._rows = {}
+        self._scores = []
+        self._tags = []
+        self._arrays = None
+
+    def _add_row(self, row: List[str]) -> None:
+        """Add the words, the sentiment score and the tag of <row> to the index"""
+        for word in set(tokenize(row[0])):
+            self._rows.setdefault(word, []).append(self.size)
+
+        self._scores.append(float(row[1]))
+        self._tags.append(TAGS.index(row[2]))
+        self._arrays = None
+
+    def _get_state(self) -> tuple:
+        """Return the rows of every word and the score and tag of every row"""
+        return self._rows, self._scores, self._tags
+
+    def _set_state(self, state: tuple) -> None:
+        """Set the rows of every word and the score and tag of every row"""
+        self._rows, self._scores, self._tags = state
+        self._arrays = None
+
+    def search(self, query: Union[str, List[str]], mode: str = 'and') -> List[int]:
+        """Return the rows of the tweets containing all the words of <query> (if <mode>
+        is 'and') or any of them (if <mode> is 'or'), in increasing order. The words of
+        the query are normalized like the words of the tweets (see tokenize).
+
+        @param query: a string with the words, or a list of words
+        @param mode: 'and' or 'or'
+        @return: list of the rows
+
+        Preconditions:
+        - mode in {'and', 'or'}
+        """
+        words = tokenize(query if isinstance(query, str) else ' '.join(query))
+
+        if not words:
+            return []
+
+        postings = sorted((self._rows.get(word, []) for word in set(words)), key=len)
+
+        if mode == 'and':
+            found = set(postings[0])
+
+            for rows in postings[1:]:
+                found.intersection_update(rows)
+        else:
+            found = set().union(*postings)
+
+        return sorted(found)
+
+    def statistics(self, rows: List[int]) -> Dict[str, Any]:
+        """Return the number of tweets, the mean and variance of their sentiment scores
+        and the number of tweets with every tag, for the tweets at <rows>"""
+        if self._arrays is None:
+            self._arrays = (np.array(self._scores), np.array(self._tags, dtype=np.int64))
+
+        scores, tags = self._arrays[0][rows], self._arrays[1][rows]
+
+        return {'count': len(rows),
+                'mean': float(scores.mean()) if len(rows) else None,
+                'variance': float(scores.var()) if len(rows) else None,
+                'tags': dict(zip(TAGS, np.bincount(tags, minlength=len(TAGS)).tolist()))}
+
+    def query(self, query: Union[str, List[str]], mode: str = 'and') -> Tuple[List[int], Dict[str, Any]]:
+        """Return the rows of the tweets matching <query> (see search) and the statistics
+        of their sentiment (see statistics)"""
+        rows = self.search(query, mode)
+
+        return rows, self.statistics(rows)
+
+
+def cached_index(index: DatasetIndex, path: str, use_cache: bool = True) -> DatasetIndex:
+    """Return <index> brought up to date with its dataset, or the index saved at <path>
+    if there is one of the same class. When the dataset has only grown since the index
+    was saved (rows were added to its end, like get_data and add_sentiments_to_data do),
+    only the new rows are read. The index is then saved at <path> again.
+
+    @param index: an empty index of the dataset
+    @param path: the path of the saved index
+    @param use_cache: if we want to use and update the saved index
+    @return: the index
+    """
+    saved = type(index).load(path, index.filepath) if use_cache else None
+
+    if saved is not None and saved.is_current():
+        return saved
+    elif saved is not None:
+        index = saved
+
+    index.update()
+
+    if use_cache:
+        try:
+            index.save(path)
+        except OSError:
+            pass
+
+    return index
+
+
+def hashtag_index(filepath: str, column: int = 3, use_cache: bool = True) -> HashtagIndex:
+    """Return the hashtag index of the dataset at <filepath>, whose hashtags are in the
+    column <column>. The index is saved next to the dataset (see cached_index).
+
+    @param filepath: the path of the dataset
+    @param column: the column of the hashtags (3 in the dataset with sentiment scores,
+                   1 in the dataset made by get_data)
+    @param use_cache: if we want to use and update the saved index
+    @return: the index
+    """
+    return cached_index(HashtagIndex(filepath, column), f'{filepath}.hashtags-{column}.marshal', use_cache)
+
+
+def text_index(filepath: str, use_cache: bool = True) -> TextIndex:
+    """Return the index of the words of the tweets of the dataset made by
+    add_sentiments_to_data at <filepath>. The index is saved next to the dataset
+    (see cached_index).
+
+    @param filepath: the path of the dataset
+    @param use_cache: if we want to use and update the saved index
+    @return: the index
+    """
+    return cached_index(TextIndex(filepath), f'{filepath}.text.marshal', use_cache)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'extra-imports': ['abc',
+                          'collections',
+                          'typing',
+                          'csv',
+                          'hashlib',
+                          'marshal',
+                          'os',
+                          're',
+                          'numpy',
+                          'data_manager'],
+        'allowed-io': ['DatasetIndex.update', 'DatasetIndex.save', 'DatasetIndex.load'],
+        'max-line-length': 150,
+        'disable': ['R1705', 'C0200']
+    })